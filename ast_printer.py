@@ -29,6 +29,12 @@ class ASTPrinter(ExprVisitor):
     def visit_set_expr(self, expr) -> None:
         return self.parenthesize(expr.object, expr.name, expr.value)
     
+    def visit_index_expr(self, expr) -> None:
+        return self.parenthesize("[]", expr.object, expr.index)
+    
+    def visit_indexset_expr(self, expr) -> None:
+        return self.parenthesize("[]=", expr.object, expr.index, expr.value)
+    
     def visit_super_expr(self, expr) -> None:
         return self.parenthesize(expr.keyword, expr.method)
     
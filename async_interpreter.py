@@ -0,0 +1,262 @@
+from environment import Environment, VariableKind
+from interpreter import Interpreter
+from lox_error import LoxRuntimeError
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from lox_native import NativeError
+from lox_return import LoxReturn
+from lox_token import TokenType
+
+from expr import Literal, Grouping, Expr, Unary, Binary, Variable, Assign, \
+                 Logical, Call, Get, Set, This, Super, Index, IndexSet
+
+from stmt import Stmt, Expression, Print, Var, Block, If, While, \
+                 Function, Return, Class, Import
+
+
+class AsyncInterpreter(Interpreter):
+    # Runs a resolved program as a coroutine, so a call to an async native
+    # suspends only this script and many scripts can share one event loop.
+    # Every visit method is a coroutine; everything that doesn't evaluate
+    # sub-nodes is shared with the Interpreter.
+
+    async def interpret(self, statements: [Stmt]):
+        try:
+            for statement in statements:
+                await self.execute(statement)
+        except LoxRuntimeError as e:
+            self.output.flush()
+            self.lox_error.runtime_error(e)
+        finally:
+            self.output.flush()
+
+    async def evaluate(self, expr: Expr) -> object:
+        return await expr.accept(self)
+
+    async def execute(self, stmt: Stmt) -> None:
+        await stmt.accept(self)
+
+    async def execute_block(self, statements, environment) -> None:
+        previous = self.environment
+        try:
+            self.environment = environment
+
+            for statement in statements:
+                await self.execute(statement)
+        finally:
+            self.environment = previous
+
+    async def execute_function(self, statements, environment, cells, lox_globals) -> None:
+        previous = self.cells
+        previous_globals = self.lox_globals
+        try:
+            self.cells = cells
+            self.lox_globals = lox_globals
+            await self.execute_block(statements, environment)
+        finally:
+            self.cells = previous
+            self.lox_globals = previous_globals
+
+    async def visit_literal_expr(self, expr: Literal) -> object:
+        return expr.value
+
+    async def visit_logical_expr(self, expr: Logical) -> object:
+        left = await self.evaluate(expr.left)
+
+        if expr.operator.token_type == TokenType.OR:
+            if self.is_truthy(left):
+                return left
+        else:
+            if not self.is_truthy(left):
+                return left
+
+        return await self.evaluate(expr.right)
+
+    async def visit_set_expr(self, expr: Set) -> object:
+        obj = await self.evaluate(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(expr.name, "only instances have fields.")
+
+        value = await self.evaluate(expr.value)
+        obj.set_instance(expr.name, value)
+        return value
+
+    async def visit_super_expr(self, expr: Super) -> object:
+        return Interpreter.visit_super_expr(self, expr)
+
+    async def visit_this_expr(self, expr: This) -> object:
+        return self.lookup_variable(expr.keyword, expr)
+
+    async def visit_grouping_expr(self, expr: Grouping) -> object:
+        return await self.evaluate(expr.expression)
+
+    async def visit_block_stmt(self, stmt: Block) -> None:
+        layout = stmt.layout
+        if layout is None:
+            for statement in stmt.statements:
+                await self.execute(statement)
+        else:
+            await self.execute_block(stmt.statements, Environment(self.environment, layout.size, layout.cells))
+
+    async def visit_class_stmt(self, stmt: Class) -> None:
+        super_class = None
+        if stmt.super_class:
+            super_class = await self.evaluate(stmt.super_class)
+        self.define_class(stmt, super_class)
+
+    async def visit_expression_stmt(self, stmt: Expression) -> None:
+        await self.evaluate(stmt.expression)
+
+    async def visit_function_stmt(self, stmt: Function) -> None:
+        Interpreter.visit_function_stmt(self, stmt)
+
+    async def visit_if_stmt(self, stmt: If) -> None:
+        if self.is_truthy(await self.evaluate(stmt.condition)):
+            await self.execute(stmt.then_branch)
+        elif stmt.else_branch:
+            await self.execute(stmt.else_branch)
+
+    async def visit_import_stmt(self, stmt: Import) -> None:
+        exports = self.modules.get(stmt.module, None)
+        if exports is None:
+            module = self.module_interpreter(stmt.module)
+            for statement in stmt.module.statements:
+                await module.execute(statement)
+            exports = self.module_exports(stmt.module, module)
+        for name, value in exports.items():
+            self.lox_globals.define(name, value)
+
+    async def visit_print_stmt(self, stmt: Print) -> None:
+        value = await self.evaluate(stmt.expression)
+        self.output.write_line(self.stringify(value))
+
+    async def visit_return_stmt(self, stmt: Return) -> None:
+        value = None
+        if stmt.value:
+            value = await self.evaluate(stmt.value)
+
+        raise LoxReturn(value)
+
+    async def visit_var_stmt(self, stmt: Var) -> None:
+        value = None
+        if stmt.initializer:
+            value = await self.evaluate(stmt.initializer)
+        self.define_variable(stmt, stmt.name, value)
+
+    async def visit_while_stmt(self, stmt: While) -> None:
+        loop = stmt.counted_loop
+        if loop is not None and await self.execute_counted_loop(loop):
+            return
+        budget = self.budget
+        while self.is_truthy(await self.evaluate(stmt.condition)):
+            if budget is not None:
+                budget.tick(stmt.keyword)
+            await self.execute(stmt.body)
+
+    async def execute_counted_loop(self, loop: object) -> bool:
+        # Same as Interpreter.execute_counted_loop, awaiting limit and body.
+        environment = self.environment.ancestor(loop.depth)
+        value = environment.values[loop.slot]
+        if type(value) is not float:
+            return False
+        step = loop.step
+        budget = self.budget
+
+        if loop.limit_invariant:
+            limit = await self.evaluate(loop.limit)
+            if type(limit) is not float:
+                return False
+            stop = self.counted_loop_stop(loop, value, limit)
+            if stop is not None:
+                counter = range(int(value), stop, int(step))
+                for count in counter:
+                    environment.values[loop.slot] = float(count)
+                    if budget is not None:
+                        budget.tick(loop.keyword)
+                    await self.execute(loop.body)
+                environment.values[loop.slot] = value + step * len(counter)
+                return True
+
+        compare = loop.compare
+        while True:
+            limit = await self.evaluate(loop.limit)
+            if type(limit) is not float:
+                environment.values[loop.slot] = value
+                return False
+            if not compare(value, limit):
+                break
+            environment.values[loop.slot] = value
+            if budget is not None:
+                budget.tick(loop.keyword)
+            await self.execute(loop.body)
+            value = value + step
+        environment.values[loop.slot] = value
+        return True
+
+    async def visit_assign_expr(self, expr: Assign) -> object:
+        value = await self.evaluate(expr.value)
+        access = expr.access
+        if access is None:
+            self.lox_globals.assign_slot(expr.global_slot, expr.name, value)
+            return value
+
+        kind, depth, slot = access
+        if kind is VariableKind.UPVALUE:
+            self.cells[slot].value = value
+        elif kind is VariableKind.CELL:
+            self.environment.get_at(depth, slot).value = value
+        else:
+            self.environment.assign_at(depth, slot, value)
+        return value
+
+    async def visit_unary_expr(self, expr: Unary) -> object:
+        return self.unary_operation(expr, await self.evaluate(expr.right))
+
+    async def visit_variable_expr(self, expr: Variable) -> object:
+        return self.lookup_variable(expr.name, expr)
+
+    async def visit_binary_expr(self, expr: Binary) -> object:
+        right = await self.evaluate(expr.right)
+        left = await self.evaluate(expr.left)
+        try:
+            return self.binary_operation(expr, left, right)
+        except ZeroDivisionError:
+            raise LoxRuntimeError(expr.operator, "Division by zero.")
+
+    async def visit_call_expr(self, expr: Call) -> object:
+        callee = await self.evaluate(expr.callee)
+
+        arguments = []
+        for argument in expr.arguments:
+            arguments.append(await self.evaluate(argument))
+
+        fun = self.check_call(expr, callee, arguments)
+        budget = self.budget
+        try:
+            if budget is None:
+                return await fun.call_async(self, arguments)
+            budget.enter_call(expr.paren, isinstance(fun, LoxClass))
+            try:
+                return await fun.call_async(self, arguments)
+            finally:
+                budget.exit_call()
+        except NativeError as e:
+            raise LoxRuntimeError(expr.paren, e.message)
+        except RecursionError:
+            raise self.stack_overflow(expr.paren)
+
+    async def visit_get_expr(self, expr: Get) -> object:
+        obj = await self.evaluate(expr.object)
+        if isinstance(obj, LoxInstance):
+            return obj.get_instance(expr.name)
+        raise LoxRuntimeError(expr.name, "Only instances have properties.")
+
+    async def visit_index_expr(self, expr: Index) -> object:
+        obj = await self.evaluate(expr.object)
+        return self.get_index(expr, obj, await self.evaluate(expr.index))
+
+    async def visit_indexset_expr(self, expr: IndexSet) -> object:
+        obj = await self.evaluate(expr.object)
+        index = await self.evaluate(expr.index)
+        return self.set_index(expr, obj, index, await self.evaluate(expr.value))
@@ -1,40 +1,122 @@
+from enum import Enum
+
 from lox_token import Token
 from lox_error import LoxRuntimeError
 
+
+class VariableKind(Enum):
+    LOCAL = "local"
+    CELL = "cell"
+    UPVALUE = "upvalue"
+
+
+class Cell:
+    # Box for a variable captured by a closure. The declaring Environment and
+    # every closure that captures the variable share the same Cell.
+    __slots__ = ("value",)
+
+    def __init__(self, value: object = None) -> None:
+        self.value = value
+
+
+class Layout:
+    # Shape of a scope as computed by the Resolver: the number of slots, the
+    # slots holding captured variables and, for functions, where each captured
+    # cell comes from when the closure is created: (is_local, depth, slot).
+    # Blocks without captured variables have no Layout, see Resolver.end_scope.
+    # names and upvalue_names are only read by the debugger.
+    def __init__(self, size: int, cells: tuple, upvalues: tuple = (), names: tuple = (),
+                 upvalue_names: tuple = ()) -> None:
+        self.size = size
+        self.cells = cells
+        self.upvalues = upvalues
+        self.names = names
+        self.upvalue_names = upvalue_names
+
+
 class Environment:
 
-    def __init__(self, enclosing=None) -> None:
+    __slots__ = ("enclosing", "values")
+
+    def __init__(self, enclosing=None, size: int = 0, cells: tuple = ()) -> None:
         self.enclosing = enclosing
-        self.values = {}
+        self.values = [None] * size
+        for slot in cells:
+            self.values[slot] = Cell()
 
-    def define(self, name: str, value: object) -> None:
-        self.values[name] = value
+    def initialize(self, slot: int, value: object) -> None:
+        # Only valid right after the scope is entered, when the slots that are
+        # not None are exactly the preallocated cells.
+        cell = self.values[slot]
+        if cell is None:
+            self.values[slot] = value
+        else:
+            cell.value = value
 
     def ancestor(self, distance: int) -> object:
         environment = self
         for _ in range(0, distance):
             environment = environment.enclosing
         return environment
-    
-    def get_env(self, name: Token) -> object:
-        if name.lexeme in self.values:
-            return self.values.get(name.lexeme) # python get
-        elif self.enclosing:
-            return self.enclosing.get_env(name) 
-        else:
-            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
         
-    def get_at(self, distance: int, name: str) -> object:
-        return self.ancestor(distance).values.get(name, None)
-    
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance).values[slot]
+        
+    def assign_at(self, distance: int, slot: int, value: object) -> None:
+        self.ancestor(distance).values[slot] = value
+
+
+class Undefined:
+    # Pickles as a reference to UNDEFINED, so a GlobalEnvironment copied to
+    # another process or saved in an image still compares with 'is'.
+    def __reduce__(self) -> str:
+        return "UNDEFINED"
+
+
+UNDEFINED = Undefined()
+
+
+class GlobalEnvironment:
+    # Globals live in a flat table. The Resolver hands out one slot per global
+    # name, so reads and writes are a single list index. A slot still holding
+    # UNDEFINED belongs to a global that is referenced but not (yet) defined.
+    UNDEFINED = UNDEFINED
+
+    def __init__(self) -> None:
+        self.enclosing = None
+        self.slots = {}
+        self.values = []
+
+    def copy(self) -> "GlobalEnvironment":
+        environment = GlobalEnvironment()
+        environment.slots = dict(self.slots)
+        environment.values = list(self.values)
+        return environment
+
+    def slot(self, name: str) -> int:
+        index = self.slots.get(name, None)
+        if index is None:
+            index = len(self.values)
+            self.slots[name] = index
+            self.values.append(GlobalEnvironment.UNDEFINED)
+        return index
+
+    def define(self, name: str, value: object) -> None:
+        self.values[self.slot(name)] = value
+
+    def get_env(self, name: Token) -> object:
+        return self.get_slot(self.slot(name.lexeme), name)
+
     def assign(self, name: Token, value: object) -> None:
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-        elif self.enclosing:
-            self.enclosing.assign(name, value)
-        else:
+        self.assign_slot(self.slot(name.lexeme), name, value)
+
+    def get_slot(self, slot: int, name: Token) -> object:
+        value = self.values[slot]
+        if value is GlobalEnvironment.UNDEFINED:
             raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
-        
-    def assign_at(self, distance: int, name: Token, value: object) -> None:
-        self.ancestor(distance).values[name.lexeme] = value
+        return value
 
+    def assign_slot(self, slot: int, name: Token, value: object) -> None:
+        if self.values[slot] is GlobalEnvironment.UNDEFINED:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        self.values[slot] = value
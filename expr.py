@@ -42,6 +42,14 @@ class ExprVisitor(ABC):
 	def visit_get_expr(self, expr) -> None:
 		raise NotImplementedError
 
+	@abstractmethod
+	def visit_index_expr(self, expr) -> None:
+		raise NotImplementedError
+
+	@abstractmethod
+	def visit_indexset_expr(self, expr) -> None:
+		raise NotImplementedError
+
 	@abstractmethod
 	def visit_grouping_expr(self, expr) -> None:
 		raise NotImplementedError
@@ -70,6 +78,8 @@ class Variable(Expr):
 
 	def __init__(self, name) -> None:
 		self.name = name
+		self.access = None
+		self.global_slot = None
 
 	def accept(self, visitor: ExprVisitor) -> object:
 		return visitor.visit_variable_expr(self)
@@ -102,6 +112,9 @@ class Super(Expr):
 	def __init__(self, keyword, method) -> None:
 		self.keyword = keyword
 		self.method = method
+		self.access = None
+		self.global_slot = None
+		self.this = None
 
 	def accept(self, visitor: ExprVisitor) -> object:
 		return visitor.visit_super_expr(self)
@@ -111,6 +124,8 @@ class This(Expr):
 
 	def __init__(self, keyword) -> None:
 		self.keyword = keyword
+		self.access = None
+		self.global_slot = None
 
 	def accept(self, visitor: ExprVisitor) -> object:
 		return visitor.visit_this_expr(self)
@@ -132,6 +147,7 @@ class Binary(Expr):
 		self.left = left
 		self.operator = operator
 		self.right = right
+		self.operand_type = None
 
 	def accept(self, visitor: ExprVisitor) -> object:
 		return visitor.visit_binary_expr(self)
@@ -158,6 +174,29 @@ class Get(Expr):
 		return visitor.visit_get_expr(self)
 
 
+class Index(Expr):
+
+	def __init__(self, object, bracket, index) -> None:
+		self.object = object
+		self.bracket = bracket
+		self.index = index
+
+	def accept(self, visitor: ExprVisitor) -> object:
+		return visitor.visit_index_expr(self)
+
+
+class IndexSet(Expr):
+
+	def __init__(self, object, bracket, index, value) -> None:
+		self.object = object
+		self.bracket = bracket
+		self.index = index
+		self.value = value
+
+	def accept(self, visitor: ExprVisitor) -> object:
+		return visitor.visit_indexset_expr(self)
+
+
 class Grouping(Expr):
 
 	def __init__(self, expression) -> None:
@@ -172,6 +211,8 @@ class Assign(Expr):
 	def __init__(self, name, value) -> None:
 		self.name = name
 		self.value = value
+		self.access = None
+		self.global_slot = None
 
 	def accept(self, visitor: ExprVisitor) -> object:
 		return visitor.visit_assign_expr(self)
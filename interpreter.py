@@ -1,47 +1,80 @@
+import math
+import operator
 import time
 
-from environment import Environment
+from environment import Environment, GlobalEnvironment, VariableKind, Layout
 from lox_error import LoxError, LoxRuntimeError
 from lox_callable import LoxCallable
+from lox_native import LoxNative, LoxAsyncNative, NativeError
 from lox_function import LoxFunction
 from lox_token import TokenType, Token
 from lox_return import LoxReturn
 from lox_class import LoxClass
 from lox_instance import LoxInstance
+from lox_list import LoxList
+from lox_map import LoxMap
+from lox_rope import LoxRope
+from lox_string import STRING_NATIVES, stringify
+from lox_type import LoxType
+from lox_output import OutputSink
 
 from expr import ExprVisitor, Literal, Grouping, Expr, Unary, \
                  Binary, Variable, Assign, Logical, Call, Get, Set, \
-                 This, Super
+                 This, Super, Index, IndexSet
 
 from stmt import StmtVisitor, Stmt, Expression, Print, Var, Block, \
-                 If, While, Function, Return, Class
+                 If, While, Function, Return, Class, Import
 
 
 class Interpreter(ExprVisitor, StmtVisitor):
 
-    class LoxClock(LoxCallable):
-        def arity(self) -> int:
-            return 0
-        
-        def call(self, interpreter: object, arguments: list[object]) -> object:
-            return time.time()
-        
-        def __str__(self) -> str:
-            return "<native fn>;"
+    NUMBER_OPERATORS = {
+        TokenType.MINUS: operator.sub,
+        TokenType.PLUS: operator.add,
+        TokenType.SLASH: operator.truediv,
+        TokenType.STAR: operator.mul,
+        TokenType.GREATER: operator.gt,
+        TokenType.GREATER_EQUAL: operator.ge,
+        TokenType.LESS: operator.lt,
+        TokenType.LESS_EQUAL: operator.le,
+    }
 
-    def __init__(self, lox_error: LoxError) -> None:
+    def __init__(self, lox_error: LoxError, stdout: object = None) -> None:
         self.lox_error = lox_error
-        self.lox_globals = Environment()
+        # an OutputSink or a stream, None prints to whatever sys.stdout is
+        # at the time
+        self.output = OutputSink.of(stdout)
+        self.lox_globals = GlobalEnvironment()
         self.environment = self.lox_globals
-        self.lox_globals.define("clock", self.LoxClock())
-        self.locals = {}
+        self.lox_globals.define("clock", LoxNative("clock", 0, time.time))
+        self.lox_globals.define("List", LoxList.CLASS)
+        self.lox_globals.define("Map", LoxMap.CLASS)
+        for native in STRING_NATIVES:
+            self.lox_globals.define(native.name, native)
+        # cells captured by the function currently executing
+        self.cells = ()
+        # Budget limiting this run, checked at loop back-edges and calls
+        self.budget = None
+        # exported globals of the modules this run imported, by Program
+        self.modules = {}
+
+    def fork(self, lox_error: LoxError, stdout: object = None, interpreter_class: type = None) -> "Interpreter":
+        # A fresh execution context for the same resolved program, globals
+        # start from this interpreter's, which numbered their slots.
+        interpreter = (interpreter_class or Interpreter)(lox_error, stdout)
+        interpreter.lox_globals = self.lox_globals.copy()
+        interpreter.environment = interpreter.lox_globals
+        return interpreter
 
     def interpret(self, statements: [Stmt]):
         try:
             for statemet in statements:
                 self.execute(statemet)
         except LoxRuntimeError as e:
+            self.output.flush()
             self.lox_error.runtime_error(e)
+        finally:
+            self.output.flush()
     
     def evaluate(self, expr: Expr) -> object:
         return expr.accept(self)
@@ -49,8 +82,22 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def execute(self, stmt: Stmt) -> None:
         stmt.accept(self)
     
-    def resolve(self, expr: Expr, depth: int) -> None:
-        self.locals[expr] = depth
+    # Resolution results are annotations on the nodes, so the AST can be
+    # shared by any number of interpreters forked from this one.
+    def resolve(self, expr: Expr, kind: VariableKind, depth: int, slot: int) -> None:
+        expr.access = (kind, depth, slot)
+
+    def resolve_global(self, expr: Expr, name: str) -> None:
+        expr.global_slot = self.lox_globals.slot(name)
+
+    def resolve_layout(self, node: object, layout: Layout) -> None:
+        node.layout = layout
+
+    def resolve_loop(self, stmt: While, loop: object) -> None:
+        stmt.counted_loop = loop
+
+    def resolve_type(self, expr: Binary, operand_type: LoxType) -> None:
+        expr.operand_type = operand_type
     
     def execute_block(self, statements, environment) -> None:
         previous = self.environment
@@ -61,6 +108,35 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 self.execute(statement)
         finally:
             self.environment = previous
+
+    def execute_function(self, statements, environment, cells, lox_globals) -> None:
+        previous = self.cells
+        previous_globals = self.lox_globals
+        try:
+            self.cells = cells
+            self.lox_globals = lox_globals
+            self.execute_block(statements, environment)
+        finally:
+            self.cells = previous
+            self.lox_globals = previous_globals
+
+    def capture(self, layout: Layout) -> tuple:
+        cells = []
+        for is_local, depth, slot in layout.upvalues:
+            if is_local:
+                cells.append(self.environment.get_at(depth, slot))
+            else:
+                cells.append(self.cells[slot])
+        return tuple(cells)
+
+    def define_variable(self, stmt: Stmt, name: Token, value: object) -> None:
+        access = stmt.access
+        if access is None:
+            self.lox_globals.define(name.lexeme, value)
+        elif access[0] is VariableKind.CELL:
+            self.environment.values[access[2]].value = value
+        else:
+            self.environment.values[access[2]] = value
     
     def visit_literal_expr(self, expr: Literal) -> object:
         return expr.value
@@ -88,9 +164,8 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return value
     
     def visit_super_expr(self, expr: Super) -> object:
-        distance = self.locals.get(expr, 0) # python dict get
-        super_class = self.environment.get_at(distance, "super")
-        obj = self.environment.get_at(distance - 1, "this")
+        super_class = self.lookup_variable(expr.keyword, expr)
+        obj = self.lookup_variable(expr.keyword, expr.this)
  
         method = super_class.find_method(expr.method.lexeme) # find_method from LoxClass
         if not method:
@@ -104,24 +179,38 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return self.evaluate(expr.expression)
     
     def visit_block_stmt(self, stmt: Block) -> None:
-        self.execute_block(stmt.statements, Environment(self.environment))
+        layout = stmt.layout
+        if layout is None:
+            # nothing in the block is captured, so its variables already have
+            # slots in the current environment
+            for statement in stmt.statements:
+                self.execute(statement)
+        else:
+            self.execute_block(stmt.statements, Environment(self.environment, layout.size, layout.cells))
 
     def visit_class_stmt(self, stmt: Class):
         super_class = None
         if stmt.super_class:
             super_class = self.evaluate(stmt.super_class)
-            if not isinstance(super_class, LoxClass):
-                raise LoxRuntimeError(stmt.super_class.name, "Superclass must be a class.")
+        self.define_class(stmt, super_class)
+
+    def define_class(self, stmt: Class, super_class: object) -> None:
+        if stmt.super_class and not isinstance(super_class, LoxClass):
+            raise LoxRuntimeError(stmt.super_class.name, "Superclass must be a class.")
 
-        self.environment.define(stmt.name.lexeme, None)
+        self.define_variable(stmt, stmt.name, None)
 
         if stmt.super_class:
-            self.environment = Environment(self.environment)
-            self.environment.define("super", super_class)
+            layout = stmt.layout
+            self.environment = Environment(self.environment, layout.size, layout.cells)
+            # methods capture 'super' from this scope
+            self.environment.initialize(0, super_class)
 
         methods = {}
         for method in stmt.methods:
-            fun = LoxFunction(method, self.environment, method.name.lexeme == "init")
+            layout = method.layout
+            fun = LoxFunction(method, layout, self.capture(layout), self.lox_globals,
+                              method.name.lexeme == "init")
             methods[method.name.lexeme] = fun
         
         klass = LoxClass(stmt.name.lexeme, super_class, methods)
@@ -129,14 +218,15 @@ class Interpreter(ExprVisitor, StmtVisitor):
         if super_class:
             self.environment = self.environment.enclosing
         
-        self.environment.assign(stmt.name, klass)
+        self.define_variable(stmt, stmt.name, klass)
     
     def visit_expression_stmt(self, stmt: Expression) -> None:
         self.evaluate(stmt.expression)
     
     def visit_function_stmt(self, stmt: Function):
-        lox_function = LoxFunction(stmt, self.environment, False)
-        self.environment.define(stmt.name.lexeme, lox_function)
+        layout = stmt.layout
+        lox_function = LoxFunction(stmt, layout, self.capture(layout), self.lox_globals, False)
+        self.define_variable(stmt, stmt.name, lox_function)
     
     def visit_if_stmt(self, stmt: If) -> None:
         if self.is_truthy(self.evaluate(stmt.condition)):
@@ -144,9 +234,37 @@ class Interpreter(ExprVisitor, StmtVisitor):
         elif stmt.else_branch:
             self.execute(stmt.else_branch)
 
+    def visit_import_stmt(self, stmt: Import) -> None:
+        exports = self.modules.get(stmt.module, None)
+        if exports is None:
+            module = self.module_interpreter(stmt.module)
+            for statement in stmt.module.statements:
+                module.execute(statement)
+            exports = self.module_exports(stmt.module, module)
+        for name, value in exports.items():
+            self.lox_globals.define(name, value)
+
+    def module_interpreter(self, module: object) -> "Interpreter":
+        # A module runs once per run, in its own globals. Runtime errors
+        # propagate to the importer.
+        interpreter = module.interpreter.fork(self.lox_error, self.output, type(self))
+        interpreter.budget = self.budget
+        interpreter.modules = self.modules
+        return interpreter
+
+    def module_exports(self, module: object, interpreter: "Interpreter") -> dict:
+        lox_globals = interpreter.lox_globals
+        exports = {}
+        for name in module.exports:
+            value = lox_globals.values[lox_globals.slots[name]]
+            if value is not GlobalEnvironment.UNDEFINED:
+                exports[name] = value
+        self.modules[module] = exports
+        return exports
+
     def visit_print_stmt(self, stmt: Print) -> None:
         value = self.evaluate(stmt.expression)
-        print( self.stringify(value))
+        self.output.write_line(self.stringify(value))
     
     def visit_return_stmt(self, stmt: Return) -> object:
         value = None
@@ -159,28 +277,106 @@ class Interpreter(ExprVisitor, StmtVisitor):
         value = None
         if stmt.initializer:
             value = self.evaluate(stmt.initializer)
-        self.environment.define(stmt.name.lexeme, value)
+        self.define_variable(stmt, stmt.name, value)
 
     def visit_while_stmt(self, stmt: While) -> None:
+        loop = stmt.counted_loop
+        if loop is not None and self.execute_counted_loop(loop):
+            return
+        budget = self.budget
+        if budget is None:
+            while self.is_truthy(self.evaluate(stmt.condition)):
+                self.execute(stmt.body)
+            return
         while self.is_truthy(self.evaluate(stmt.condition)):
+            budget.tick(stmt.keyword)
             self.execute(stmt.body)
 
+    def execute_counted_loop(self, loop: object) -> bool:
+        # Runs a loop found by the LoopAnalyzer with the counter kept in a
+        # Python variable. Returns False, with the counter stored back, when
+        # the operands are not plain numbers and the loop must run as usual.
+        environment = self.environment.ancestor(loop.depth)
+        value = environment.values[loop.slot]
+        if type(value) is not float:
+            return False
+        step = loop.step
+        budget = self.budget
+
+        if loop.limit_invariant:
+            limit = self.evaluate(loop.limit)
+            if type(limit) is not float:
+                return False
+            stop = self.counted_loop_stop(loop, value, limit)
+            if stop is not None:
+                counter = range(int(value), stop, int(step))
+                for count in counter:
+                    environment.values[loop.slot] = float(count)
+                    if budget is not None:
+                        budget.tick(loop.keyword)
+                    self.execute(loop.body)
+                environment.values[loop.slot] = value + step * len(counter)
+                return True
+
+        compare = loop.compare
+        while True:
+            limit = self.evaluate(loop.limit)
+            if type(limit) is not float:
+                environment.values[loop.slot] = value
+                return False
+            if not compare(value, limit):
+                break
+            environment.values[loop.slot] = value
+            if budget is not None:
+                budget.tick(loop.keyword)
+            self.execute(loop.body)
+            value = value + step
+        environment.values[loop.slot] = value
+        return True
+
+    def counted_loop_stop(self, loop: object, value: float, limit: float) -> int:
+        # range() stop for the loop, or None when a float counter is needed:
+        # fractional or huge numbers, or a step going away from the limit.
+        exact = 2.0 ** 53
+        if not value.is_integer() or not loop.step.is_integer() or not math.isfinite(limit) \
+                or abs(value) >= exact or abs(limit) >= exact:
+            return None
+        if loop.comparison == TokenType.LESS and loop.step > 0:
+            return math.ceil(limit)
+        if loop.comparison == TokenType.LESS_EQUAL and loop.step > 0:
+            return math.floor(limit) + 1
+        if loop.comparison == TokenType.GREATER and loop.step < 0:
+            return math.floor(limit)
+        if loop.comparison == TokenType.GREATER_EQUAL and loop.step < 0:
+            return math.ceil(limit) - 1
+        return None
+
     def visit_assign_expr(self, expr: Assign) -> object:
         value = self.evaluate(expr.value)
-        distance = self.locals.get(expr, 0)
-        if distance == 0:
-            self.lox_globals.assign(expr.name, value)
+        access = expr.access
+        if access is None:
+            self.lox_globals.assign_slot(expr.global_slot, expr.name, value)
+            return value
+
+        kind, depth, slot = access
+        if kind is VariableKind.UPVALUE:
+            self.cells[slot].value = value
+        elif kind is VariableKind.CELL:
+            self.environment.get_at(depth, slot).value = value
         else:
-            self.environment.assign_at(distance, expr.name, value)
+            self.environment.assign_at(depth, slot, value)
         return value
     
     def visit_unary_expr(self, expr: Unary) -> object:
-        right = self.evaluate(expr.right)
+        return self.unary_operation(expr, self.evaluate(expr.right))
 
+    def unary_operation(self, expr: Unary, right: object) -> object:
         if expr.operator.token_type == TokenType.BANG:
-            return not self.is_thruthy(right)
+            return not self.is_truthy(right)
         elif expr.operator.token_type == TokenType.MINUS:
-            return -1 * self.format_number(right)
+            if type(right) is not float:
+                raise LoxRuntimeError(expr.operator, "Operand must be a number.")
+            return -right
         
         return None
     
@@ -188,11 +384,17 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return self.lookup_variable(expr.name, expr)
     
     def lookup_variable(self, name: Token, expr: Expr) -> object:
-        distance = self.locals.get(expr, None)
-        if distance is not None:
-            return self.environment.get_at(distance, name.lexeme)
-        else:
-            return self.lox_globals.get_env(name)
+        access = expr.access
+        if access is None:
+            return self.lox_globals.get_slot(expr.global_slot, name)
+
+        kind, depth, slot = access
+        if kind is VariableKind.UPVALUE:
+            return self.cells[slot].value
+        value = self.environment.get_at(depth, slot)
+        if kind is VariableKind.CELL:
+            return value.value
+        return value
             
     
     def is_truthy(self, obj:object) -> bool:
@@ -220,36 +422,56 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def visit_binary_expr(self, expr: Binary) -> object:
         right = self.evaluate(expr.right)
         left = self.evaluate(expr.left)
-        
+        try:
+            if expr.operand_type is LoxType.NUMBER:
+                return Interpreter.NUMBER_OPERATORS[expr.operator.token_type](left, right)
+            return self.binary_operation(expr, left, right)
+        except ZeroDivisionError:
+            raise LoxRuntimeError(expr.operator, "Division by zero.")
+
+    def binary_operation(self, expr: Binary, left: object, right: object) -> object:
         operator_type = expr.operator.token_type
+
+        operand_type = expr.operand_type
+        if operand_type is LoxType.NUMBER:
+            return Interpreter.NUMBER_OPERATORS[operator_type](left, right)
+        elif operand_type is LoxType.STRING:
+            return LoxRope.concat(left, right)
+        elif type(left) is float and type(right) is float and operator_type in Interpreter.NUMBER_OPERATORS:
+            # not proven statically, but guarded here before the full checks
+            return Interpreter.NUMBER_OPERATORS[operator_type](left, right)
         
         if operator_type == TokenType.MINUS:
-            self.check_number_oprands(operator_type, left, right)
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) - self.format_number(right)
         elif operator_type == TokenType.PLUS:
-            if isinstance(left, str) and isinstance(right, str):
-                return str(left) + str(right)
-            elif self.check_number_oprands(operator_type, left, right):
+            if isinstance(left, (str, LoxRope)) and isinstance(right, (str, LoxRope)):
+                return LoxRope.concat(left, right)
+            elif self.check_number_oprands(expr.operator, left, right):
                 return self.format_number(left) + self.format_number(right)
             else:
                 raise LoxRuntimeError(expr.operator, "operands must be two numbers or two strings")
         elif operator_type == TokenType.SLASH:
-            self.check_number_oprands(operator_type, left, right)
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) / self.format_number(right)
         elif operator_type == TokenType.STAR:
-            self.check_number_oprands(operator_type, left, right)
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) * self.format_number(right)
         elif operator_type == TokenType.GREATER:
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) > self.format_number(right)
         elif operator_type == TokenType.GREATER_EQUAL:
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) >= self.format_number(right)
         elif operator_type == TokenType.LESS:
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) < self.format_number(right)
         elif operator_type == TokenType.LESS_EQUAL:
+            self.check_number_oprands(expr.operator, left, right)
             return self.format_number(left) <= self.format_number(right)
         elif operator_type == TokenType.BANG_EQUAL:
             return not self.is_equal(left, right)
-        elif operator_type == TokenType.BANG_EQUAL:
+        elif operator_type == TokenType.EQUAL_EQUAL:
             return self.is_equal(left, right)
         else:
             return None
@@ -261,37 +483,86 @@ class Interpreter(ExprVisitor, StmtVisitor):
         for arguement in expr.arguments:
             arguments.append(self.evaluate(arguement))
         
+        fun = self.check_call(expr, callee, arguments)
+        if isinstance(fun, LoxAsyncNative):
+            raise LoxRuntimeError(expr.paren, f"Can't call async native '{fun.name}' outside async mode.")
+
+        budget = self.budget
+        try:
+            if budget is None:
+                return fun.call(self, arguments)
+            budget.enter_call(expr.paren, isinstance(fun, LoxClass))
+            try:
+                return fun.call(self, arguments)
+            finally:
+                budget.exit_call()
+        except NativeError as e:
+            raise LoxRuntimeError(expr.paren, e.message)
+        except RecursionError:
+            raise self.stack_overflow(expr.paren)
+    
+    def stack_overflow(self, token: Token) -> LoxRuntimeError:
+        # Deep recursion runs into Python's recursion limit. The innermost
+        # call turns that into a Lox runtime error, or the budget's.
+        if self.budget is not None:
+            return self.budget.stack_overflow(token)
+        return LoxRuntimeError(token, "Stack overflow.")
+
+    def check_call(self, expr: Call, callee: object, arguments: list) -> LoxCallable:
         if not isinstance(callee, LoxCallable):
-            raise RuntimeError(expr.paren, "Can only call functions and classes.")
-        
-        fun = callee
-        if len(arguments) != fun.arity():
+            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+        if len(arguments) != callee.arity():
             raise LoxRuntimeError(expr.paren, \
-                                  f"Expected {fun.arity()} argumenets but got {len(arguments)}.")
+                                  f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+        return callee
 
-        return fun.call(self, arguments)
-    
     def visit_get_expr(self, expr: Get) -> object:
         obj = self.evaluate(expr.object)
         if isinstance(obj, LoxInstance):
             return obj.get_instance(expr.name) # get instance property for expr.name
         raise LoxRuntimeError(expr.name, "Only instances have properties.")
 
+    def visit_index_expr(self, expr: Index) -> object:
+        obj = self.evaluate(expr.object)
+        return self.get_index(expr, obj, self.evaluate(expr.index))
+
+    def visit_indexset_expr(self, expr: IndexSet) -> object:
+        obj = self.evaluate(expr.object)
+        index = self.evaluate(expr.index)
+        return self.set_index(expr, obj, index, self.evaluate(expr.value))
+
+    def get_index(self, expr: Index, obj: object, index: object) -> object:
+        try:
+            if isinstance(obj, LoxList):
+                return obj.get(index)
+            if isinstance(obj, LoxMap):
+                return obj.get(LoxRope.flatten(index))
+        except NativeError as e:
+            raise LoxRuntimeError(expr.bracket, e.message)
+        raise LoxRuntimeError(expr.bracket, "Only lists and maps can be indexed.")
+
+    def set_index(self, expr: IndexSet, obj: object, index: object, value: object) -> object:
+        try:
+            if isinstance(obj, LoxList):
+                return obj.set(index, value)
+            if isinstance(obj, LoxMap):
+                obj.put(LoxRope.flatten(index), value)
+                return value
+        except NativeError as e:
+            raise LoxRuntimeError(expr.bracket, e.message)
+        raise LoxRuntimeError(expr.bracket, "Only lists and maps can be indexed.")
+
     def is_equal(self, a: object, b: object) -> bool:
+        # Interned names and literals are usually the very same object.
+        if a is b:
+            return True
         if a == None and b == None:
             return True
         elif a == None:
             return False
         else:
-            return a == b
+            return LoxRope.flatten(a) == LoxRope.flatten(b)
         
     def stringify(self, obj: object) -> str:
-        if obj == None:
-            return "nil"
-        
-        text = str(obj)
-        if isinstance(obj, float) and text.endswith(".0"):
-            text = text[:-2]
-
-        return text
+        return stringify(obj)
     
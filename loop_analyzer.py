@@ -0,0 +1,220 @@
+import operator
+
+from interpreter import Interpreter
+from environment import VariableKind
+from lox_token import TokenType, Token
+from expr import ExprVisitor, Literal, Grouping, Expr, Unary, \
+                 Binary, Variable, Assign, Logical, Call, Get, Set, \
+                 This, Super, Index, IndexSet
+from stmt import StmtVisitor, Stmt, Expression, Print, Var, Block, \
+                 If, While, Function, Return, Class, Import
+
+
+class CountedLoop:
+    # A while loop of the shape the parser produces for
+    #   for (...; i < limit; i = i + step) body
+    # where i is an uncaptured local that only the increment assigns.
+    # limit_invariant means limit can't change while the loop runs.
+    COMPARE = {
+        TokenType.LESS: operator.lt,
+        TokenType.LESS_EQUAL: operator.le,
+        TokenType.GREATER: operator.gt,
+        TokenType.GREATER_EQUAL: operator.ge,
+    }
+
+    def __init__(self, keyword: Token, depth: int, slot: int, comparison: TokenType, limit: Expr,
+                 limit_invariant: bool, step: float, body: Stmt) -> None:
+        self.keyword = keyword
+        self.depth = depth
+        self.slot = slot
+        self.comparison = comparison
+        self.compare = CountedLoop.COMPARE[comparison]
+        self.limit = limit
+        self.limit_invariant = limit_invariant
+        self.step = step
+        self.body = body
+
+
+class LoopAnalyzer(ExprVisitor, StmtVisitor):
+    # Runs after the Resolver and hands every counted loop it recognizes to
+    # the interpreter, which then drives it with a native counter.
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        # number of assignments seen per name in the code walked so far
+        self.assigned = {}
+
+    def analyze(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self.walk(statement)
+
+    def walk(self, node: object) -> None:
+        if node is not None:
+            node.accept(self)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        enclosing = self.assigned
+        self.assigned = {}
+        self.walk(stmt.condition)
+        self.walk(stmt.body)
+
+        loop = self.counted_loop(stmt)
+        if loop is not None:
+            self.interpreter.resolve_loop(stmt, loop)
+
+        for name, count in self.assigned.items():
+            enclosing[name] = enclosing.get(name, 0) + count
+        self.assigned = enclosing
+
+    def counted_loop(self, stmt: While) -> CountedLoop:
+        condition = stmt.condition
+        if not isinstance(condition, Binary) or condition.operator.token_type not in CountedLoop.COMPARE:
+            return None
+        counter = condition.left
+        if not isinstance(counter, Variable):
+            return None
+        access = counter.access
+        if access is None or access[0] is not VariableKind.LOCAL:
+            return None
+
+        # body is Block([body, Expression(increment)]) and must not need an
+        # Environment of its own
+        wrapper = stmt.body
+        if not isinstance(wrapper, Block) or len(wrapper.statements) != 2 or wrapper.layout is not None:
+            return None
+        body, increment = wrapper.statements
+        if not isinstance(increment, Expression):
+            return None
+        step = self.step(increment.expression, counter.name.lexeme)
+        if step is None:
+            return None
+        # the increment is the only assignment to the counter
+        if self.assigned.get(counter.name.lexeme, 0) != 1:
+            return None
+
+        limit = condition.right
+        if not self.is_pure(limit):
+            # the limit is evaluated before every iteration, as in the loop
+            return None
+        limit_invariant = False
+        if isinstance(limit, Literal):
+            limit_invariant = True
+        elif isinstance(limit, Variable):
+            limit_access = limit.access
+            limit_invariant = limit_access is not None and limit_access[0] is VariableKind.LOCAL \
+                and self.assigned.get(limit.name.lexeme, 0) == 0
+
+        return CountedLoop(stmt.keyword, access[1], access[2], condition.operator.token_type, limit,
+                           limit_invariant, step, body)
+
+    def is_pure(self, expr: Expr) -> bool:
+        if isinstance(expr, (Literal, Variable, This)):
+            return True
+        if isinstance(expr, Grouping):
+            return self.is_pure(expr.expression)
+        if isinstance(expr, Get):
+            return self.is_pure(expr.object)
+        return False
+
+    def step(self, expr: Expr, name: str) -> float:
+        # i = i + step, i = step + i or i = i - step with a number literal
+        if not isinstance(expr, Assign) or expr.name.lexeme != name or not isinstance(expr.value, Binary):
+            return None
+        left, right = expr.value.left, expr.value.right
+        operator_type = expr.value.operator.token_type
+        if isinstance(right, Literal) and isinstance(left, Variable) and left.name.lexeme == name:
+            step = right.value
+        elif operator_type == TokenType.PLUS and isinstance(left, Literal) \
+                and isinstance(right, Variable) and right.name.lexeme == name:
+            step = left.value
+        else:
+            return None
+        if type(step) is not float:
+            return None
+        if operator_type == TokenType.MINUS:
+            return -step
+        if operator_type == TokenType.PLUS:
+            return step
+        return None
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.analyze(stmt.statements)
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self.walk(stmt.super_class)
+        for method in stmt.methods:
+            self.walk(method)
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self.walk(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.analyze(stmt.body)
+
+    def visit_if_stmt(self, stmt: If) -> None:
+        self.walk(stmt.condition)
+        self.walk(stmt.then_branch)
+        self.walk(stmt.else_branch)
+
+    def visit_import_stmt(self, stmt: Import) -> None:
+        return None
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self.walk(stmt.expression)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        self.walk(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        self.walk(stmt.initializer)
+
+    def visit_assign_expr(self, expr: Assign) -> None:
+        self.assigned[expr.name.lexeme] = self.assigned.get(expr.name.lexeme, 0) + 1
+        self.walk(expr.value)
+
+    def visit_binary_expr(self, expr: Binary) -> None:
+        self.walk(expr.left)
+        self.walk(expr.right)
+
+    def visit_call_expr(self, expr: Call) -> None:
+        self.walk(expr.callee)
+        for argument in expr.arguments:
+            self.walk(argument)
+
+    def visit_get_expr(self, expr: Get) -> None:
+        self.walk(expr.object)
+
+    def visit_index_expr(self, expr: Index) -> None:
+        self.walk(expr.object)
+        self.walk(expr.index)
+
+    def visit_indexset_expr(self, expr: IndexSet) -> None:
+        self.walk(expr.object)
+        self.walk(expr.index)
+        self.walk(expr.value)
+
+    def visit_grouping_expr(self, expr: Grouping) -> None:
+        self.walk(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal) -> None:
+        return None
+
+    def visit_logical_expr(self, expr: Logical) -> None:
+        self.walk(expr.left)
+        self.walk(expr.right)
+
+    def visit_set_expr(self, expr: Set) -> None:
+        self.walk(expr.object)
+        self.walk(expr.value)
+
+    def visit_super_expr(self, expr: Super) -> None:
+        return None
+
+    def visit_this_expr(self, expr: This) -> None:
+        return None
+
+    def visit_unary_expr(self, expr: Unary) -> None:
+        self.walk(expr.right)
+
+    def visit_variable_expr(self, expr: Variable) -> None:
+        return None
@@ -1,31 +1,62 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import Self
 
 from lox_error import LoxError
-from scanner import Scanner
-from lox_parser import LoxParser
-from ast_printer import ASTPrinter
+from lox_budget import Budget
+from lox_program import Program, RunResult, compile, compile_file
+from lox_debugger import DebugConsole, DebuggerQuit
+from lox_image import Image, ImageError, load_image, save_image
+from lox_heap_stats import HeapStatsInterpreter
 from interpreter import Interpreter
-from resolver import Resolver
   
 
 class Lox:
 
-    def __init__(self) -> None:
+    def __init__(self, type_stats: bool = False, budget: Budget = None, heap_stats: bool = False,
+                 image: Image = None, save_image: str = None, debug: bool = False) -> None:
         self.lox_error = LoxError()
+        self.type_stats = type_stats
+        self.budget = budget
+        self.heap_stats = heap_stats
+        # globals loaded from an image that scripts start from, and the image
+        # file to save the globals of a successful run to
+        self.image = image
+        self.save_image = save_image
+        # run scripts under the DebugConsole
+        self.debug = debug
         
-    def run_file(self, path: str) -> Self:
+    def run_file(self, path: str) -> int:
+        # exit status for the script
         try:
-            with open(path, 'r') as reader:
-                file_bytes = reader.read()
-                self.run(file_bytes)
-                if self.lox_error.had_error:
-                    SystemExit(65)
-                if self.lox_error.had_runtime_error:
-                    SystemExit(70)
+            program = compile_file(path, self.image)
         except OSError as e:
-            print("Unexpected error opening {path} is", e.strerror)
-            SystemExit(1)
+            print(f"Unexpected error opening {path}: {e.strerror}")
+            return 1
+        try:
+            result = self.run_program(program, path)
+        except ImageError as e:
+            print(e)
+            return 1
+        if self.save_image is not None and result is not None and result.ok:
+            try:
+                save_image(self.save_image, result.interpreter.lox_globals)
+            except OSError as e:
+                print(f"Unexpected error writing {self.save_image}: {e.strerror}")
+                return 1
+            except ImageError as e:
+                print(e)
+                return 1
+        if self.lox_error.had_error:
+            return 65
+        if self.lox_error.had_runtime_error:
+            return 70
+        return 0
 
     def run_prompt(self) -> Self:
         try:
@@ -37,34 +68,124 @@ class Lox:
             print("\n Exiting due to {e}, Goodbye!")
 
     def run(self, source) -> Self:
-        
-        scanner = Scanner(source, self.lox_error)
-        tokens = scanner.scan_tokens()
-        parser = LoxParser(tokens, self.lox_error)
-        statements = parser.parse()
+        self.run_program(compile(source, image=self.image))
 
-        if self.lox_error.had_error:
-             SystemExit(65)
+    def run_program(self, program: Program, path: str = None) -> RunResult:
+        # path is the script's, for the debugger to list
+        for diagnostic in program.diagnostics:
+            self.lox_error.add(diagnostic)
+        if self.type_stats and program.type_report:
+            print(program.type_report, file=sys.stderr)
+        if not program.ok:
+            self.lox_error.had_error = True
+            return None
+        interpreter_class = HeapStatsInterpreter if self.heap_stats else Interpreter
+        if self.debug and path is not None:
+            return self.debug_program(program, path, interpreter_class)
+        result = program.run(lox_error=self.lox_error, budget=self.budget, interpreter_class=interpreter_class)
+        if self.heap_stats:
+            print(result.interpreter.heap_stats.report(), file=sys.stderr)
+        return result
 
-        interpreter = Interpreter(self.lox_error)
-        resolver = Resolver(interpreter, self.lox_error)
-        resolver.resolve_block(statements)
-        if self.lox_error.had_error:
-            return
-        interpreter.interpret(statements)
+    def debug_program(self, program: Program, path: str, interpreter_class: type) -> RunResult:
+        interpreter, lox_error = program.start(interpreter_class, None, None, self.lox_error, self.budget)
+        with open(path, 'r') as reader:
+            source = reader.read()
+        try:
+            DebugConsole(interpreter, program.statements, source).run()
+        except DebuggerQuit:
+            pass
+        return RunResult(interpreter, lox_error)
+
+
+def run_script(path: str, type_stats: bool, budget: Budget, heap_stats: bool,
+               image: Image) -> tuple:
+    # Runs in a batch worker: the script's stdout, stderr and exit status.
+    output = io.StringIO()
+    errors = io.StringIO()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+        status = Lox(type_stats, budget, heap_stats, image).run_file(path)
+    return output.getvalue(), errors.getvalue(), status
 
-        # print(ASTPrinter().print_ast(expression))
-        # for token in tokens:
-        #     print(token)
+
+def script_paths(patterns: list[str], manifest: str) -> list[str]:
+    # Scripts named on the command line, glob patterns expanded, followed by
+    # the ones listed in the manifest, one per line, relative to it.
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if any(c in pattern for c in "*?[") else []
+        paths.extend(matches or [pattern])
+    if manifest:
+        with open(manifest, 'r') as reader:
+            for line in reader:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    paths.append(os.path.join(os.path.dirname(manifest), line))
+    return paths
+
+
+def run_batch(paths: list[str], jobs: int, type_stats: bool, budget: Budget, heap_stats: bool,
+              image: Image) -> int:
+    # Output is written in the order of paths, whichever worker finishes
+    # first. The exit status is the highest of the scripts'.
+    status = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(run_script, paths, [type_stats] * len(paths), [budget] * len(paths),
+                               [heap_stats] * len(paths), [image] * len(paths))
+        for path, (output, errors, script_status) in zip(paths, results):
+            print(f"==> {path} <==")
+            sys.stdout.write(output)
+            sys.stderr.write(errors)
+            if script_status:
+                print(f"[exit {script_status}]")
+            status = max(status, script_status)
+            sys.stdout.flush()
+    return status
 
 
 if __name__ == "__main__":
-    lox = Lox()
-    args = sys.argv[1:]
-    if len(args) > 1:
-        print("Usage: pylox [script]")
-        sys.exit(1)
-    elif len(args) == 1:
-        lox.run_file(args[0])
+    parser = argparse.ArgumentParser(prog="pylox")
+    parser.add_argument("scripts", nargs="*", help="scripts or glob patterns, more than one runs a batch")
+    parser.add_argument("--manifest", help="file listing scripts to run as a batch, one per line")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes for a batch")
+    parser.add_argument("--type-stats", action="store_true",
+                        help="report how many operations have proven operand types")
+    parser.add_argument("--heap-stats", action="store_true",
+                        help="report what the script allocates and where, and its peak memory")
+    parser.add_argument("--max-steps", type=int, help="stop after this many loop iterations and calls")
+    parser.add_argument("--max-depth", type=int, help="maximum Lox call depth")
+    parser.add_argument("--timeout", type=float, help="maximum run time in seconds")
+    parser.add_argument("--max-instances", type=int, help="maximum number of instances created")
+    parser.add_argument("--debug", action="store_true",
+                        help="run the script in a debugger with breakpoints and stepping")
+    parser.add_argument("--image", help="start from the globals saved in this image")
+    parser.add_argument("--save-image", metavar="IMAGE",
+                        help="save the globals to this image once the script ran without errors")
+    args = parser.parse_args()
+
+    budget = None
+    if any(limit is not None for limit in (args.max_steps, args.max_depth, args.timeout, args.max_instances)):
+        try:
+            budget = Budget(args.max_steps, args.max_depth, args.timeout, args.max_instances)
+        except ValueError as e:
+            parser.error(str(e))
+    image = None
+    if args.image:
+        try:
+            image = load_image(args.image)
+        except OSError as e:
+            print(f"Unexpected error opening {args.image}: {e.strerror}")
+            sys.exit(1)
+        except ImageError as e:
+            print(e)
+            sys.exit(1)
+    paths = script_paths(args.scripts, args.manifest)
+    if len(paths) > 1 or args.manifest:
+        if args.save_image or args.debug:
+            parser.error("--save-image and --debug need a single script")
+        sys.exit(run_batch(paths, args.jobs, args.type_stats, budget, args.heap_stats, image))
+    lox = Lox(args.type_stats, budget, args.heap_stats, image, args.save_image, args.debug)
+    if paths:
+        sys.exit(lox.run_file(paths[0]))
     else:
-        lox.run_prompt()           
\ No newline at end of file
+        lox.run_prompt()
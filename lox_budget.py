@@ -0,0 +1,78 @@
+import sys
+import time
+
+from lox_error import LoxRuntimeError
+from lox_token import Token
+
+
+class BudgetExceeded(LoxRuntimeError):
+    pass
+
+
+class Budget:
+    # Limits for one run of a program. A step is one loop iteration or one
+    # call, which bounds everything a script can do while keeping the checks
+    # out of plain statements and expressions. None means no limit.
+    CLOCK_INTERVAL = 256   # steps between two looks at the clock
+    # Python frames a Lox call takes, about 9 for a plain call and 25 for
+    # one nested in blocks and expressions. Deeper call depth limits than
+    # Python's recursion limit allows for that can't be reached.
+    FRAMES_PER_CALL = 25
+
+    def __init__(self, max_steps: int = None, max_depth: int = None,
+                 max_seconds: float = None, max_instances: int = None) -> None:
+        if max_depth is not None and max_depth > Budget.reachable_depth():
+            raise ValueError(f"call depth limit {max_depth} is too deep, Python's recursion limit of "
+                             f"{sys.getrecursionlimit()} allows {Budget.reachable_depth()}")
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.max_seconds = max_seconds
+        self.max_instances = max_instances
+        self.steps = 0
+        self.depth = 0
+        self.instances = 0
+        self.deadline = None
+        self.next_clock = Budget.CLOCK_INTERVAL
+
+    def start(self) -> "Budget":
+        # Fresh counters for a run, so one Budget can be handed to many runs.
+        budget = Budget(self.max_steps, self.max_depth, self.max_seconds, self.max_instances)
+        if self.max_seconds is not None:
+            budget.deadline = time.monotonic() + self.max_seconds
+        return budget
+
+    def tick(self, token: Token) -> None:
+        self.steps += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetExceeded(token, f"Step limit of {self.max_steps} exceeded.")
+        if self.steps >= self.next_clock:
+            self.next_clock += Budget.CLOCK_INTERVAL
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                raise BudgetExceeded(token, f"Time limit of {self.max_seconds:g} seconds exceeded.")
+
+    def enter_call(self, token: Token, creates_instance: bool) -> None:
+        self.tick(token)
+        self.depth += 1
+        if self.max_depth is not None and self.depth > self.max_depth:
+            self.depth -= 1
+            raise BudgetExceeded(token, f"Call depth limit of {self.max_depth} exceeded.")
+        if creates_instance:
+            self.instances += 1
+            if self.max_instances is not None and self.instances > self.max_instances:
+                self.depth -= 1
+                raise BudgetExceeded(token, f"Instance limit of {self.max_instances} exceeded.")
+
+    @staticmethod
+    def reachable_depth() -> int:
+        return sys.getrecursionlimit() // Budget.FRAMES_PER_CALL
+
+    def exit_call(self) -> None:
+        self.depth -= 1
+
+    def stack_overflow(self, token: Token) -> BudgetExceeded:
+        # Python's stack ran out before the call depth limit was reached,
+        # in calls nested unusually deep in expressions
+        if self.max_depth is None:
+            return BudgetExceeded(token, "Stack overflow.")
+        return BudgetExceeded(token, f"Call depth limit of {self.max_depth} exceeded: "
+                                     f"the stack overflowed at depth {self.depth}.")
@@ -8,4 +8,9 @@ class LoxCallable(ABC):
     
     @abstractmethod
     def call(self, interpreter: object, arguments: list[object]) -> object:
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+    async def call_async(self, interpreter: object, arguments: list[object]) -> object:
+        # Called by the AsyncInterpreter, callables that never run Lox code
+        # can stay synchronous.
+        return self.call(interpreter, arguments)
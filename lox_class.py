@@ -3,32 +3,43 @@ from lox_instance import LoxInstance
 from lox_function import LoxFunction
 
 class LoxClass(LoxCallable):
-    def __init__(self, name: str, super_class: object, methods: dict) -> None:
+    def __init__(self, name: str, super_class: object, methods: dict, instance_class: type = None) -> None:
         self.name = name
         self.super_class = super_class
         self.methods = methods
+        # What calling the class creates, a subclass of LoxInstance for the
+        # built-in classes and their subclasses.
+        if instance_class is None:
+            instance_class = super_class.instance_class if super_class else LoxInstance
+        self.instance_class = instance_class
+        # Every method an instance can call, inherited ones included. Classes
+        # never change once created, so the table is built once here.
+        self.method_table = dict(super_class.method_table) if super_class else {}
+        self.method_table.update(methods)
+        self.initializer = self.method_table.get("init", None)
+        self.initializer_arity = self.initializer.arity() if self.initializer else 0
     
     def __str__(self) -> str:
         return self.name
     
     def find_method(self, name: str) -> LoxFunction:
-        if name in self.methods:
-            return self.methods.get(name, None) # Python dict get
-        if self.super_class:
-            return self.super_class.find_method(name)
-        return None
+        return self.method_table.get(name, None)
     
     def call(self, interpreter: object, arguments: list) -> object:
-        instance = LoxInstance(self)
-        initializer = self.find_method("init")
+        instance = self.instance_class(self)
+        initializer = self.initializer
         if initializer:
             initializer.bind(instance).call(interpreter, arguments)
 
         return instance
+
+    async def call_async(self, interpreter: object, arguments: list) -> object:
+        instance = self.instance_class(self)
+        initializer = self.initializer
+        if initializer:
+            await initializer.bind(instance).call_async(interpreter, arguments)
+
+        return instance
     
     def arity(self) -> int:
-        initializer = self.find_method("init")
-        if not initializer:
-            return 0
-        else:
-            return initializer.arity()
\ No newline at end of file
+        return self.initializer_arity
\ No newline at end of file
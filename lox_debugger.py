@@ -0,0 +1,340 @@
+import copy
+import sys
+from abc import ABC, abstractmethod
+
+from environment import Cell, GlobalEnvironment
+from interpreter import Interpreter
+from lox_function import LoxFunction
+from lox_instance import LoxInstance
+from stmt import Stmt, Block, Class, Function, If, Import, While
+
+
+class DebuggerQuit(Exception):
+    pass
+
+
+class Debugger(ABC):
+    # Breakpoints and stepping for one Interpreter, at no cost to the
+    # statements that run normally. A breakpoint replaces the accept method
+    # of just the statements starting on its line, and only while stepping
+    # is the interpreter's execute replaced by one that decides where to
+    # stop. Calls in progress are found on the Python stack when needed.
+    # Subclasses implement paused(); Interpreter only, not AsyncInterpreter.
+    #
+    # A compiled Program is shared by its runs and importers, so the
+    # debugger works on a copy of its statements: run self.statements, not
+    # the Program. Imported modules are not copied and can't be debugged.
+
+    def __init__(self, interpreter: Interpreter, statements: list[Stmt]) -> None:
+        self.interpreter = interpreter
+        memo = {id(statement.module): statement.module for statement in statements
+                if isinstance(statement, Import) and statement.module is not None}
+        self.statements = copy.deepcopy(statements, memo)
+        # line -> the statements starting on it
+        self.lines = {}
+        for statement in self.statements:
+            self.index(statement)
+        # line -> the statements whose accept was replaced
+        self.breakpoints = {}
+        # "step", "next" or "finish" while stepping
+        self.mode = None
+        self.target_depth = 0
+        # where the program is paused
+        self.statement = None
+
+    def index(self, stmt: Stmt) -> None:
+        if stmt is None:
+            return
+        if stmt.line is not None:
+            self.lines.setdefault(stmt.line, []).append(stmt)
+        if isinstance(stmt, Block):
+            for statement in stmt.statements:
+                self.index(statement)
+        elif isinstance(stmt, If):
+            self.index(stmt.then_branch)
+            self.index(stmt.else_branch)
+        elif isinstance(stmt, While):
+            self.index(stmt.body)
+        elif isinstance(stmt, Function):
+            for statement in stmt.body:
+                self.index(statement)
+        elif isinstance(stmt, Class):
+            for method in stmt.methods:
+                self.index(method)
+
+    def set_breakpoint(self, line: int) -> bool:
+        # False when no statement starts on the line
+        statements = self.lines.get(line, None)
+        if not statements:
+            return False
+        if line not in self.breakpoints:
+            for stmt in statements:
+                stmt.accept = self.breakpoint_accept(stmt)
+            self.breakpoints[line] = statements
+        return True
+
+    def clear_breakpoint(self, line: int) -> bool:
+        statements = self.breakpoints.pop(line, None)
+        if statements is None:
+            return False
+        for stmt in statements:
+            del stmt.accept
+        return True
+
+    def breakpoint_accept(self, stmt: Stmt) -> object:
+        accept = type(stmt).accept
+
+        def accept_at_breakpoint(visitor: object) -> object:
+            # the AST may be shared with interpreters this one doesn't debug
+            if visitor is self.interpreter:
+                self.pause(stmt)
+            return accept(stmt, visitor)
+        return accept_at_breakpoint
+
+    def step(self, mode: str) -> None:
+        # Resumes until the next statement ("step"), the next one in this
+        # call or its callers ("next") or the next one in a caller ("finish").
+        self.mode = mode
+        self.target_depth = self.call_depth()
+        self.interpreter.execute = self.stepping_execute
+
+    def resume(self) -> None:
+        self.mode = None
+        self.interpreter.__dict__.pop("execute", None)
+
+    def close(self) -> None:
+        self.resume()
+        for line in list(self.breakpoints):
+            self.clear_breakpoint(line)
+
+    def stepping_execute(self, stmt: Stmt) -> None:
+        if stmt.line is not None and self.should_stop():
+            self.pause(stmt)
+            # already stopped here, skip a breakpoint on the same statement
+            type(stmt).accept(stmt, self.interpreter)
+        else:
+            stmt.accept(self.interpreter)
+
+    def should_stop(self) -> bool:
+        if self.mode == "step":
+            return True
+        if self.mode == "next":
+            return self.call_depth() <= self.target_depth
+        return self.call_depth() < self.target_depth
+
+    def pause(self, stmt: Stmt) -> None:
+        self.resume()
+        self.statement = stmt
+        self.interpreter.output.flush()
+        try:
+            self.paused(stmt)
+        finally:
+            self.statement = None
+
+    @abstractmethod
+    def paused(self, stmt: Stmt) -> None:
+        # Called before stmt runs. Return after calling step() to step,
+        # without it to continue to the next breakpoint.
+        raise NotImplementedError
+
+    # Inspection, while paused
+
+    def calls(self) -> list:
+        # (LoxFunction, line) of every call in progress, innermost first, and
+        # (None, line) for the script itself
+        calls = []
+        line = None
+        frame = sys._getframe()
+        while frame is not None:
+            code = frame.f_code
+            if code in Debugger.EXECUTE_CODES:
+                statement = frame.f_locals.get("stmt", None)
+                if line is None and statement is not None and statement.line is not None:
+                    line = statement.line
+            elif code is Debugger.CALL_CODE:
+                calls.append((frame.f_locals["self"], line))
+                line = None
+            frame = frame.f_back
+        calls.append((None, line))
+        return calls
+
+    def call_depth(self) -> int:
+        depth = 0
+        frame = sys._getframe()
+        while frame is not None:
+            if frame.f_code is Debugger.CALL_CODE:
+                depth += 1
+            frame = frame.f_back
+        return depth
+
+    def scopes(self) -> list:
+        # (title, [(name, value)]) of every scope visible where the program
+        # is paused, innermost first. Blocks with an Environment of their own
+        # are found by their visit_block_stmt frames, the innermost function
+        # by its LoxFunction.call frame.
+        layouts = []
+        function = None
+        frame = sys._getframe()
+        while frame is not None:
+            if frame.f_code is Debugger.BLOCK_CODE:
+                layout = frame.f_locals.get("layout", None)
+                if layout is not None:
+                    layouts.append(layout)
+            elif frame.f_code is Debugger.CALL_CODE:
+                function = frame.f_locals["self"]
+                break
+            frame = frame.f_back
+
+        scopes = []
+        environment = self.interpreter.environment
+        for layout in layouts:
+            if environment is None or isinstance(environment, GlobalEnvironment):
+                break
+            scopes.append(("block", self.variables(layout.names, environment.values)))
+            environment = environment.enclosing
+        if function is not None and environment is not None \
+                and not isinstance(environment, GlobalEnvironment):
+            layout = function.layout
+            scopes.append((f"function {function.declaration.name.lexeme}",
+                           self.variables(layout.names, environment.values)))
+            if layout.upvalue_names:
+                scopes.append(("captured", self.variables(layout.upvalue_names, self.interpreter.cells)))
+
+        lox_globals = self.interpreter.lox_globals
+        names = [name for name, slot in sorted(lox_globals.slots.items(), key=lambda item: item[1])
+                 if lox_globals.values[slot] is not GlobalEnvironment.UNDEFINED]
+        scopes.append(("globals", [(name, lox_globals.values[lox_globals.slots[name]]) for name in names]))
+        return scopes
+
+    def variables(self, names: tuple, values: list) -> list:
+        return [(name, value.value if isinstance(value, Cell) else value)
+                for name, value in zip(names, values)]
+
+    def lookup(self, name: str) -> tuple:
+        # (True, value) of the innermost variable called name, (False, None)
+        # when there is none
+        for _, variables in self.scopes():
+            for variable, value in variables:
+                if variable == name:
+                    return True, value
+        return False, None
+
+
+Debugger.EXECUTE_CODES = (Interpreter.execute.__code__, Debugger.stepping_execute.__code__)
+Debugger.CALL_CODE = LoxFunction.call.__code__
+Debugger.BLOCK_CODE = Interpreter.visit_block_stmt.__code__
+
+
+class DebugConsole(Debugger):
+    # A command line debugger on stdin and stdout, stopping before the first
+    # statement of the script.
+    HELP = """Commands:
+  b LINE       set a breakpoint before the statements starting on LINE
+  d LINE       delete the breakpoint on LINE
+  c            continue to the next breakpoint
+  s            step to the next statement, into calls
+  n            step to the next statement in this call, over calls
+  o            step out of this call
+  p NAME       print a variable, or a field of one: p this.count
+  this         print 'this'
+  env          print every scope, innermost first
+  bt           print the calls in progress
+  l            list the source around the current line
+  q            quit"""
+
+    def __init__(self, interpreter: Interpreter, statements: list[Stmt], source: str,
+                 input: object = None, output: object = None) -> None:
+        super().__init__(interpreter, statements)
+        self.source_lines = source.splitlines()
+        self.input = input
+        self.output = output
+
+    def run(self) -> None:
+        self.step("step")
+        try:
+            self.interpreter.interpret(self.statements)
+        finally:
+            self.close()
+
+    def write(self, text: str) -> None:
+        print(text, file=self.output or sys.stdout)
+
+    def read(self) -> str:
+        if self.input is None:
+            return input("(lox-debug) ")
+        line = self.input.readline()
+        if not line:
+            raise EOFError
+        return line
+
+    def paused(self, stmt: Stmt) -> None:
+        self.show_line(stmt.line)
+        while True:
+            try:
+                words = self.read().split()
+            except EOFError:
+                raise DebuggerQuit()
+            if not words:
+                continue
+            command, arguments = words[0], words[1:]
+            if command in ("c", "continue"):
+                return
+            if command in ("s", "step"):
+                return self.step("step")
+            if command in ("n", "next"):
+                return self.step("next")
+            if command in ("o", "finish"):
+                return self.step("finish")
+            if command in ("q", "quit"):
+                raise DebuggerQuit()
+            self.command(command, arguments)
+
+    def command(self, command: str, arguments: list[str]) -> None:
+        if command in ("b", "break", "d", "delete"):
+            if len(arguments) != 1 or not arguments[0].isdigit():
+                self.write(f"Usage: {command} LINE")
+            elif command in ("b", "break"):
+                if self.set_breakpoint(int(arguments[0])):
+                    self.write(f"Breakpoint at line {arguments[0]}.")
+                else:
+                    self.write(f"No statement starts on line {arguments[0]}.")
+            elif not self.clear_breakpoint(int(arguments[0])):
+                self.write(f"No breakpoint on line {arguments[0]}.")
+        elif command in ("p", "print") and len(arguments) == 1:
+            self.show_variable(arguments[0])
+        elif command == "this":
+            self.show_variable("this")
+        elif command == "env":
+            for title, variables in self.scopes():
+                self.write(f"{title}:")
+                for name, value in variables:
+                    self.write(f"  {name} = {self.interpreter.stringify(value)}")
+        elif command == "bt":
+            for function, line in self.calls():
+                name = "script" if function is None else f"<fn {function.declaration.name.lexeme}>"
+                self.write(f"  {name} at line {line}")
+        elif command in ("l", "list"):
+            line = self.statement.line
+            for number in range(max(1, line - 5), min(len(self.source_lines), line + 5) + 1):
+                marker = "->" if number == line else "B " if number in self.breakpoints else "  "
+                self.write(f"{marker}{number:>4}  {self.source_lines[number - 1]}")
+        else:
+            self.write(DebugConsole.HELP)
+
+    def show_variable(self, path: str) -> None:
+        # a variable, or fields of one: p this.count
+        name, *fields = path.split(".")
+        found, value = self.lookup(name)
+        if not found:
+            self.write(f"No variable '{name}' here.")
+            return
+        for field in fields:
+            if not isinstance(value, LoxInstance) or field not in value.fields:
+                self.write(f"No field '{field}' in {self.interpreter.stringify(value)}.")
+                return
+            value = value.fields[field]
+        self.write(f"{path} = {self.interpreter.stringify(value)}")
+
+    def show_line(self, line: int) -> None:
+        text = self.source_lines[line - 1] if 0 < line <= len(self.source_lines) else ""
+        self.write(f"[line {line}] {text.strip()}")
@@ -1,4 +1,5 @@
 from lox_token import Token, TokenType
+from lox_output import OutputSink
 
 class LoxRuntimeError(RuntimeError):
 
@@ -10,17 +11,37 @@ class LoxRuntimeError(RuntimeError):
     def report(self) -> str:
         return f"{self.message}\n[line: {self.token.line}]"
 
+class Diagnostic:
+    # One reported error, kind is "error" for scan, parse and resolve errors
+    # and "runtime" for a LoxRuntimeError.
+    def __init__(self, kind: str, line: int, where: str, message: str) -> None:
+        self.kind = kind
+        self.line = line
+        self.where = where
+        self.message = message
+
+    def __str__(self) -> str:
+        if self.kind == "runtime":
+            return f"{self.message}\n[line: {self.line}]"
+        return "[line " + str(self.line) + " Error]" + self.where + ": " + self.message
+
 class LoxError:
 
-    def __init__(self) -> None:
+    def __init__(self, output: object = None, echo: bool = True) -> None:
         self.had_error = False
         self.had_runtime_error = False
+        self.diagnostics = []
+        # output is an OutputSink or a stream, None prints to whatever
+        # sys.stdout is at the time. echo False only collects the diagnostics.
+        # Errors are written as soon as they are reported.
+        self.output = OutputSink.of(output, buffer_size=0)
+        self.echo = echo
 
     def error(self, line: int, message: str) -> None:
         self.report(line, "", message)
     
     def runtime_error(self, error: LoxRuntimeError) -> None:
-        print(error.report())
+        self.add(Diagnostic("runtime", error.token.line, "", error.message))
         self.had_runtime_error = True
 
     
@@ -31,8 +52,13 @@ class LoxError:
             self.report(token.line, " at '" + token.lexeme + "'", message)
 
     def report(self, line: int, where: str, message:str) -> None:
-        print("[line " + str(line) + " Error]" + where + ": " + message)
+        self.add(Diagnostic("error", line, where, message))
         self.had_error = True
+
+    def add(self, diagnostic: Diagnostic) -> None:
+        self.diagnostics.append(diagnostic)
+        if self.echo:
+            self.output.write_line(str(diagnostic))
     
 
 class ParseError(RuntimeError):
@@ -1,28 +1,51 @@
 from lox_callable import LoxCallable
 from lox_return import LoxReturn
-from environment import Environment
+from environment import Environment, Layout
 from stmt import Function
 
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: Function, closure: Environment, is_initializer: bool) -> None:
-        self.closure = closure
+    def __init__(self, declaration: Function, layout: Layout, cells: tuple, lox_globals: object,
+                 is_initializer: bool, instance: object = None) -> None:
+        # cells holds only the variables this function captures, in the order
+        # of layout.upvalues. Methods get 'this' in slot 0 once bound.
+        # lox_globals are the globals of the module that defined the function,
+        # which its global slots were resolved against.
         self.declaration = declaration
+        self.layout = layout
+        self.cells = cells
+        self.lox_globals = lox_globals
         self.is_initializer = is_initializer
+        self.instance = instance
     
     def bind(self, instance: object) -> object:
-        environment = Environment(self.closure)
-        environment.define("this", instance)
-        return LoxFunction(self.declaration, environment, self.is_initializer)
+        return LoxFunction(self.declaration, self.layout, self.cells, self.lox_globals,
+                           self.is_initializer, instance)
+
+    def environment(self, arguments: list) -> Environment:
+        environment = Environment(None, self.layout.size, self.layout.cells)
+        if self.instance is not None:
+            arguments = [self.instance] + arguments
+        for slot in range(0, len(arguments)):
+            environment.initialize(slot, arguments[slot])
+        return environment
 
     def call(self, interpreter:object, arguments) -> object:
-        environment = Environment(self.closure)
-        for i in range(0, len(self.declaration.params)):
-            environment.define(self.declaration.params[i].lexeme, arguments[i])
+        environment = self.environment(arguments)
+        try:
+            interpreter.execute_function(self.declaration.body, environment, self.cells, self.lox_globals)
+        except LoxReturn as return_value:
+            if self.is_initializer:
+                return self.instance
+            return return_value.value
+        return None
+
+    async def call_async(self, interpreter: object, arguments: list) -> object:
+        environment = self.environment(arguments)
         try:
-            interpreter.execute_block(self.declaration.body, environment)
+            await interpreter.execute_function(self.declaration.body, environment, self.cells, self.lox_globals)
         except LoxReturn as return_value:
             if self.is_initializer:
-                return self.closure.get_at(0, "this")
+                return self.instance
             return return_value.value
         return None
     
@@ -32,4 +55,3 @@ class LoxFunction(LoxCallable):
     def __str__(self) -> str:
         return "<fn " + self.declaration.name.lexeme + ">"
     
-
@@ -0,0 +1,186 @@
+import gc
+import tracemalloc
+
+from environment import Environment, GlobalEnvironment, Cell
+from interpreter import Interpreter
+from lox_callable import LoxCallable
+from lox_class import LoxClass
+from lox_function import LoxFunction
+from lox_instance import LoxInstance
+from lox_native import LoxNative
+from lox_rope import LoxRope
+from lox_string import STRING_NATIVES
+
+from expr import Assign, Binary, Call, Get, Set, Super, IndexSet
+from stmt import Stmt, Class, Function, Return, Var, While
+
+
+class HeapStats:
+    KINDS = ("environments", "functions", "bound methods", "instances", "strings")
+
+    def __init__(self) -> None:
+        self.total = dict.fromkeys(HeapStats.KINDS, 0)
+        self.live = None
+        # (kind, line) -> number allocated there
+        self.sites = {}
+        self.peak = None
+
+    def allocate(self, kind: str, line: int) -> None:
+        self.total[kind] += 1
+        site = (kind, line)
+        self.sites[site] = self.sites.get(site, 0) + 1
+
+    def count_live(self) -> None:
+        # What is still reachable once the program is done. Strings are not
+        # tracked by the gc, they are counted where Lox variables hold them.
+        gc.collect()
+        self.live = dict.fromkeys(HeapStats.KINDS, 0)
+        strings = {}
+        for obj in gc.get_objects():
+            values = ()
+            if isinstance(obj, Environment) and not isinstance(obj, GlobalEnvironment):
+                self.live["environments"] += 1
+                values = obj.values
+            elif isinstance(obj, GlobalEnvironment):
+                values = obj.values
+            elif isinstance(obj, LoxFunction):
+                self.live["bound methods" if obj.instance is not None else "functions"] += 1
+            elif isinstance(obj, LoxInstance):
+                self.live["instances"] += 1
+                values = obj.fields.values()
+            elif isinstance(obj, Cell):
+                values = (obj.value,)
+            for value in values:
+                if isinstance(value, (str, LoxRope)):
+                    strings[id(value)] = value
+        self.live["strings"] = len(strings)
+
+    def report(self, sites: int = 10) -> str:
+        lines = ["Heap statistics:", f"  {'':<14} {'total':>10} {'live':>10}"]
+        for kind in HeapStats.KINDS:
+            live = "" if self.live is None else self.live[kind]
+            lines.append(f"  {kind:<14} {self.total[kind]:>10} {live:>10}")
+        if self.peak is not None:
+            lines.append(f"  peak memory    {self.peak / 1024:>10.1f} KiB")
+        top = sorted(self.sites.items(), key=lambda item: item[1], reverse=True)[:sites]
+        if top:
+            lines.append("Top allocation sites:")
+            for (kind, line), count in top:
+                lines.append(f"  [line {line}] {count} {kind}")
+        return "\n".join(lines)
+
+
+class HeapStatsInterpreter(Interpreter):
+    # Counts what a program allocates and where. self.line is the line of
+    # the last node with a token, which is where the next allocation is
+    # charged; only this subclass pays for tracking it.
+
+    # the string natives' functions, natives loaded from an image are new
+    # LoxNatives around the same functions
+    STRING_FUNCTIONS = {native.function for native in STRING_NATIVES}
+
+    def __init__(self, lox_error: object, stdout: object = None) -> None:
+        super().__init__(lox_error, stdout)
+        self.heap_stats = HeapStats()
+        self.line = 0
+        # the call of a string native being made, natives don't call back
+        # into Lox so no other call can replace it before it returns
+        self.string_call = None
+
+    def interpret(self, statements: [Stmt]):
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        try:
+            super().interpret(statements)
+        finally:
+            self.heap_stats.peak = tracemalloc.get_traced_memory()[1]
+            if not tracing:
+                tracemalloc.stop()
+            self.heap_stats.count_live()
+
+    def module_interpreter(self, module: object) -> Interpreter:
+        # imported modules are charged to the same statistics
+        interpreter = super().module_interpreter(module)
+        interpreter.heap_stats = self.heap_stats
+        return interpreter
+
+    def execute_block(self, statements, environment) -> None:
+        # function calls and blocks with captured variables
+        self.heap_stats.allocate("environments", self.line)
+        super().execute_block(statements, environment)
+
+    def visit_call_expr(self, expr: Call) -> object:
+        value = super().visit_call_expr(expr)
+        if self.string_call is expr and isinstance(value, str):
+            self.heap_stats.allocate("strings", expr.paren.line)
+        return value
+
+    def check_call(self, expr: Call, callee: object, arguments: list) -> LoxCallable:
+        fun = super().check_call(expr, callee, arguments)
+        self.line = expr.paren.line
+        string_native = isinstance(fun, LoxNative) and fun.function in HeapStatsInterpreter.STRING_FUNCTIONS
+        self.string_call = expr if string_native else None
+        if isinstance(fun, LoxClass):
+            self.heap_stats.allocate("instances", self.line)
+            if fun.initializer is not None:
+                self.heap_stats.allocate("bound methods", self.line)
+        return fun
+
+    def define_class(self, stmt: Class, super_class: object) -> None:
+        self.line = stmt.name.line
+        if stmt.layout is not None:
+            self.heap_stats.allocate("environments", self.line)
+        for method in stmt.methods:
+            self.heap_stats.allocate("functions", method.name.line)
+        super().define_class(stmt, super_class)
+
+    def visit_function_stmt(self, stmt: Function):
+        self.line = stmt.name.line
+        self.heap_stats.allocate("functions", self.line)
+        super().visit_function_stmt(stmt)
+
+    def visit_get_expr(self, expr: Get) -> object:
+        value = super().visit_get_expr(expr)
+        self.line = expr.name.line
+        if isinstance(value, LoxFunction) and value.instance is not None \
+                and expr.name.lexeme not in value.instance.fields:
+            self.heap_stats.allocate("bound methods", self.line)
+        return value
+
+    def visit_super_expr(self, expr: Super) -> object:
+        self.line = expr.method.line
+        self.heap_stats.allocate("bound methods", self.line)
+        return super().visit_super_expr(expr)
+
+    def visit_binary_expr(self, expr: Binary) -> object:
+        value = super().visit_binary_expr(expr)
+        self.line = expr.operator.line
+        if isinstance(value, (str, LoxRope)):
+            self.heap_stats.allocate("strings", self.line)
+        return value
+
+    def visit_set_expr(self, expr: Set) -> object:
+        self.line = expr.name.line
+        return super().visit_set_expr(expr)
+
+    def visit_indexset_expr(self, expr: IndexSet) -> object:
+        self.line = expr.bracket.line
+        return super().visit_indexset_expr(expr)
+
+    def visit_assign_expr(self, expr: Assign) -> object:
+        self.line = expr.name.line
+        return super().visit_assign_expr(expr)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        self.line = stmt.name.line
+        super().visit_var_stmt(stmt)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        self.line = stmt.keyword.line
+        super().visit_return_stmt(stmt)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        self.line = stmt.keyword.line
+        super().visit_while_stmt(stmt)
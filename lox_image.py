@@ -0,0 +1,143 @@
+import hashlib
+import pickle
+
+import environment
+import expr
+import interpreter
+import loop_analyzer
+import lox_class
+import lox_function
+import lox_instance
+import lox_iterator
+import lox_list
+import lox_map
+import lox_native
+import lox_rope
+import lox_string
+import lox_token
+import lox_type
+import stmt
+from environment import GlobalEnvironment
+
+
+class ImageError(Exception):
+    pass
+
+
+# An image is MAGIC, a pickled header and the pickled GlobalEnvironment.
+# The header is read first so a stale image is rejected before anything in
+# it is unpickled. It also has the slot of every global and which of them
+# hold a value, all that compiling against the image needs, so the globals
+# are only unpickled by the runs.
+MAGIC = b"pylox image\n"
+# Bump when what is saved changes shape.
+FORMAT_VERSION = 2
+
+# Images pickle instances of the classes in these modules, and the AST with
+# the annotations the resolver and analyzers left on it, which the
+# interpreter reads back. An image only loads into the same sources.
+IMAGE_MODULES = (environment, expr, stmt, lox_token, lox_type, lox_function, lox_class,
+                 lox_instance, lox_native, lox_rope, lox_string, lox_list, lox_map, lox_iterator,
+                 loop_analyzer, interpreter)
+
+
+def interpreter_version() -> str:
+    digest = hashlib.sha256()
+    for module in IMAGE_MODULES:
+        with open(module.__file__, 'rb') as reader:
+            digest.update(reader.read())
+    return digest.hexdigest()[:16]
+
+
+class Saved:
+    def __repr__(self) -> str:
+        return "SAVED"
+
+
+# stands for a value saved in an image, in the globals a program compiles
+# against
+SAVED = Saved()
+
+
+class Image:
+    # The saved globals of a prelude run. Every run starting from the image
+    # gets its own copy of them, unpickled from data, so runs never share
+    # instances and the image's functions see the globals of their run.
+    def __init__(self, path: str, data: bytes, slots: dict, defined: list) -> None:
+        self.path = path
+        self.data = data
+        # global name -> slot, and the slots holding a value
+        self.slots = slots
+        self.defined = defined
+
+    def template(self) -> GlobalEnvironment:
+        # The globals to compile against: the image's slots, with SAVED in
+        # those that hold a value. Runs replace them with globals().
+        lox_globals = GlobalEnvironment()
+        lox_globals.slots = dict(self.slots)
+        lox_globals.values = [GlobalEnvironment.UNDEFINED] * len(self.slots)
+        for slot in self.defined:
+            lox_globals.values[slot] = SAVED
+        return lox_globals
+
+    def globals(self, template: GlobalEnvironment = None) -> GlobalEnvironment:
+        # template is a copy of template() that a compile gave more slots
+        # to; the copy gets the same slots, numbered the same
+        try:
+            lox_globals = pickle.loads(self.data)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            raise ImageError(f"{self.path} is damaged: {e}.")
+        if not isinstance(lox_globals, GlobalEnvironment):
+            raise ImageError(f"{self.path} is damaged: it holds no globals.")
+        if template is not None:
+            lox_globals.slots = dict(template.slots)
+            lox_globals.values.extend(template.values[len(lox_globals.values):])
+        return lox_globals
+
+
+def save_image(path: str, lox_globals: GlobalEnvironment) -> None:
+    # Saves the globals of a finished run: classes, functions with the cells
+    # they captured, instances and the AST of every function reachable from
+    # them. Natives are saved by reference to their Python function, which
+    # must be importable by name when the image is loaded.
+    header = {"format": FORMAT_VERSION, "interpreter": interpreter_version(),
+              "slots": dict(lox_globals.slots),
+              "defined": [slot for slot, value in enumerate(lox_globals.values)
+                          if value is not GlobalEnvironment.UNDEFINED]}
+    try:
+        data = pickle.dumps(lox_globals, protocol=pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        raise ImageError(f"Can't save image {path}: the globals are nested too deeply.")
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise ImageError(f"Can't save image {path}: {e}.")
+    with open(path, 'wb') as writer:
+        writer.write(MAGIC)
+        pickle.dump(header, writer, protocol=pickle.HIGHEST_PROTOCOL)
+        writer.write(data)
+
+
+def load_image(path: str) -> Image:
+    # Raises OSError when the file can't be read and ImageError when it isn't
+    # an image this interpreter made. Only the header is checked here, the
+    # globals are unpickled by each run. Only load images you made:
+    # unpickling can run arbitrary code.
+    with open(path, 'rb') as reader:
+        if reader.read(len(MAGIC)) != MAGIC:
+            raise ImageError(f"{path} is not a pylox image.")
+        try:
+            header = pickle.load(reader)
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            raise ImageError(f"{path} is damaged: {e}.")
+        if not isinstance(header, dict):
+            raise ImageError(f"{path} is damaged: it has no header.")
+        if header.get("format") != FORMAT_VERSION:
+            raise ImageError(f"{path} has image format {header.get('format')}, expected {FORMAT_VERSION}.")
+        if header.get("interpreter") != interpreter_version():
+            raise ImageError(f"{path} was saved by a different version of the interpreter.")
+        slots, defined = header.get("slots"), header.get("defined")
+        if not isinstance(slots, dict) or not isinstance(defined, list):
+            raise ImageError(f"{path} is damaged: its header has no globals.")
+        data = reader.read()
+    if not data:
+        raise ImageError(f"{path} is damaged: it holds no globals.")
+    return Image(path, data, slots, defined)
@@ -0,0 +1,33 @@
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from lox_native import LoxNativeMethod, NativeError
+
+
+class LoxIterator(LoxInstance):
+    # Walks a snapshot of a built-in collection:
+    #   var keys = map.keys();
+    #   while (keys.hasNext()) print keys.next();
+    def __init__(self, klass: LoxClass, values: list = ()) -> None:
+        super().__init__(klass)
+        self.values = values
+        self.index = 0
+
+    @staticmethod
+    def of(values: list) -> "LoxIterator":
+        return LoxIterator(LoxIterator.CLASS, values)
+
+    def has_next(self) -> bool:
+        return self.index < len(self.values)
+
+    def next(self) -> object:
+        if self.index >= len(self.values):
+            raise NativeError("No more elements.")
+        value = self.values[self.index]
+        self.index += 1
+        return value
+
+
+LoxIterator.CLASS = LoxClass("Iterator", None, {
+    "hasNext": LoxNativeMethod("hasNext", 0, LoxIterator.has_next),
+    "next": LoxNativeMethod("next", 0, LoxIterator.next),
+}, LoxIterator)
@@ -0,0 +1,134 @@
+import functools
+
+from lox_callable import LoxCallable
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from lox_iterator import LoxIterator
+from lox_native import LoxNativeMethod, NativeError
+from lox_rope import LoxRope
+
+
+class LoxList(LoxInstance):
+    # An instance of the built-in List class, elements in a Python list.
+    # Indexes are whole numbers from 0 to length() - 1, and list[index]
+    # reads and assigns them like get() and set() would.
+    def __init__(self, klass: LoxClass, values: list = None) -> None:
+        super().__init__(klass)
+        self.values = [] if values is None else values
+
+    @staticmethod
+    def of(values: list) -> "LoxList":
+        return LoxList(LoxList.CLASS, values)
+
+    def position(self, index: object, last: int) -> int:
+        # index as an int, last being the largest one allowed
+        if not isinstance(index, float) or not index.is_integer():
+            raise NativeError("List index must be a whole number.")
+        if not 0 <= index <= last:
+            raise NativeError("List index out of range.")
+        return int(index)
+
+    def get(self, index: object) -> object:
+        return self.values[self.position(index, len(self.values) - 1)]
+
+    def set(self, index: object, value: object) -> object:
+        # Lox strings are stored flat, as the natives receive them
+        value = LoxRope.flatten(value)
+        self.values[self.position(index, len(self.values) - 1)] = value
+        return value
+
+    def append(self, value: object) -> None:
+        self.values.append(value)
+
+    def pop(self) -> object:
+        if not self.values:
+            raise NativeError("Can't pop from an empty list.")
+        return self.values.pop()
+
+    def length(self) -> float:
+        return float(len(self.values))
+
+    def slice(self, start: object, end: object) -> "LoxList":
+        # a new List of the elements from start up to but not including end
+        start = self.position(start, len(self.values))
+        end = self.position(end, len(self.values))
+        return LoxList.of(self.values[start:end])
+
+    def extend(self, other: object) -> None:
+        if not isinstance(other, LoxList):
+            raise NativeError("Can only extend a list with another list.")
+        self.values.extend(other.values)
+
+    def sort(self) -> None:
+        # in place, in ascending order of numbers or of strings
+        values = self.values
+        if not (all(isinstance(value, float) for value in values)
+                or all(isinstance(value, str) for value in values)):
+            raise NativeError("Can only sort lists of only numbers or only strings, use sortBy().")
+        values.sort()
+
+    @staticmethod
+    def comparator(comparator: object) -> LoxCallable:
+        if not isinstance(comparator, LoxCallable) or comparator.arity() != 2:
+            raise NativeError("Comparator must be a function of two arguments.")
+        return comparator
+
+    @staticmethod
+    def order(result: object) -> float:
+        # what the comparator returned, negative when a comes before b
+        if not isinstance(result, float):
+            raise NativeError("Comparator must return a number.")
+        return result
+
+    def sort_by(self, interpreter: object, comparator: object) -> None:
+        # In place, stable, comparator(a, b) being negative when a comes
+        # before b. A copy is sorted so the comparator can't see or change
+        # a half sorted list.
+        comparator = LoxList.comparator(comparator)
+
+        def compare(a: object, b: object) -> float:
+            return LoxList.order(comparator.call(interpreter, [a, b]))
+        self.values[:] = sorted(self.values, key=functools.cmp_to_key(compare))
+
+    async def sort_by_async(self, interpreter: object, comparator: object) -> None:
+        # sort_by for the AsyncInterpreter, sorted() can't await the
+        # comparator so this is a merge sort, stable like sorted()
+        comparator = LoxList.comparator(comparator)
+
+        async def merge_sort(values: list) -> list:
+            if len(values) <= 1:
+                return values
+            middle = len(values) // 2
+            left = await merge_sort(values[:middle])
+            right = await merge_sort(values[middle:])
+            merged = []
+            i = j = 0
+            while i < len(left) and j < len(right):
+                if LoxList.order(await comparator.call_async(interpreter, [right[j], left[i]])) < 0:
+                    merged.append(right[j])
+                    j += 1
+                else:
+                    merged.append(left[i])
+                    i += 1
+            merged.extend(left[i:])
+            merged.extend(right[j:])
+            return merged
+        self.values[:] = await merge_sort(list(self.values))
+
+    def iterator(self) -> LoxIterator:
+        # changes to the list don't affect the iterator
+        return LoxIterator.of(list(self.values))
+
+
+LoxList.CLASS = LoxClass("List", None, {
+    "get": LoxNativeMethod("get", 1, LoxList.get),
+    "set": LoxNativeMethod("set", 2, LoxList.set),
+    "append": LoxNativeMethod("append", 1, LoxList.append),
+    "pop": LoxNativeMethod("pop", 0, LoxList.pop),
+    "length": LoxNativeMethod("length", 0, LoxList.length),
+    "slice": LoxNativeMethod("slice", 2, LoxList.slice),
+    "extend": LoxNativeMethod("extend", 1, LoxList.extend),
+    "sort": LoxNativeMethod("sort", 0, LoxList.sort),
+    "sortBy": LoxNativeMethod("sortBy", 1, LoxList.sort_by, LoxList.sort_by_async),
+    "iterator": LoxNativeMethod("iterator", 0, LoxList.iterator),
+}, LoxList)
@@ -0,0 +1,55 @@
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from lox_iterator import LoxIterator
+from lox_native import LoxNativeMethod, NativeError
+
+
+class LoxMap(LoxInstance):
+    # An instance of the built-in Map class, entries in a Python dict.
+    # Natives get their arguments flattened, so keys are compared the way
+    # Interpreter.is_equal compares values: two keys are the same entry
+    # exactly when == says they are equal, instances only to themselves.
+    def __init__(self, klass: LoxClass) -> None:
+        super().__init__(klass)
+        self.entries = {}
+
+    @staticmethod
+    def key(value: object) -> object:
+        if value is None or isinstance(value, (str, float, bool, LoxInstance)):
+            return value
+        raise NativeError("Map keys must be strings, numbers, booleans, nil or instances.")
+
+    def get(self, key: object) -> object:
+        # nil when there is no entry
+        return self.entries.get(LoxMap.key(key), None)
+
+    def put(self, key: object, value: object) -> None:
+        self.entries[LoxMap.key(key)] = value
+
+    def has(self, key: object) -> bool:
+        return LoxMap.key(key) in self.entries
+
+    def delete(self, key: object) -> bool:
+        # whether there was an entry to delete
+        key = LoxMap.key(key)
+        if key in self.entries:
+            del self.entries[key]
+            return True
+        return False
+
+    def size(self) -> float:
+        return float(len(self.entries))
+
+    def keys(self) -> LoxIterator:
+        # in insertion order, changes to the map don't affect the iterator
+        return LoxIterator.of(list(self.entries))
+
+
+LoxMap.CLASS = LoxClass("Map", None, {
+    "get": LoxNativeMethod("get", 1, LoxMap.get),
+    "put": LoxNativeMethod("put", 2, LoxMap.put),
+    "has": LoxNativeMethod("has", 1, LoxMap.has),
+    "delete": LoxNativeMethod("delete", 1, LoxMap.delete),
+    "size": LoxNativeMethod("size", 0, LoxMap.size),
+    "keys": LoxNativeMethod("keys", 0, LoxMap.keys),
+}, LoxMap)
@@ -0,0 +1,95 @@
+import inspect
+
+from lox_callable import LoxCallable
+from lox_rope import LoxRope
+
+
+class NativeError(Exception):
+    # Raised by a native for a runtime error, which is reported at the call.
+    def __init__(self, message: str) -> None:
+        super().__init__(message)
+        self.message = message
+
+
+class LoxNative(LoxCallable):
+    # A Lox callable implemented by a Python function. Arguments are plain
+    # Python values, strings are always flattened to str.
+    def __init__(self, name: str, arity: int, function: object) -> None:
+        self.name = name
+        self.native_arity = arity
+        self.function = function
+
+    @staticmethod
+    def wrap(name: str, function: object) -> "LoxNative":
+        parameters = inspect.signature(function).parameters.values()
+        arity = len([parameter for parameter in parameters if parameter.default is inspect.Parameter.empty
+                     and parameter.kind in (inspect.Parameter.POSITIONAL_ONLY,
+                                            inspect.Parameter.POSITIONAL_OR_KEYWORD)])
+        if inspect.iscoroutinefunction(function):
+            return LoxAsyncNative(name, arity, function)
+        return LoxNative(name, arity, function)
+
+    @staticmethod
+    def to_lox(name: str, value: object) -> object:
+        # A Python value handed to Lox code, by the host or returned by a
+        # native: ints become numbers and Python functions natives.
+        if isinstance(value, int) and not isinstance(value, bool):
+            return float(value)
+        if callable(value) and not isinstance(value, LoxCallable):
+            return LoxNative.wrap(name, value)
+        return value
+
+    def arity(self) -> int:
+        return self.native_arity
+
+    def call(self, interpreter: object, arguments: list[object]) -> object:
+        return LoxNative.to_lox(self.name, self.function(*[LoxRope.flatten(argument) for argument in arguments]))
+
+    def __str__(self) -> str:
+        return "<native fn>"
+
+
+class LoxAsyncNative(LoxNative):
+    # A native defined with 'async def'. Only the AsyncInterpreter can call
+    # it, awaiting it suspends just the script that made the call.
+    async def call_async(self, interpreter: object, arguments: list[object]) -> object:
+        return LoxNative.to_lox(self.name,
+                                await self.function(*[LoxRope.flatten(argument) for argument in arguments]))
+
+
+class LoxCallbackNative(LoxNative):
+    # A native that calls Lox functions back, which takes the interpreter
+    # before its arguments. The AsyncInterpreter calls async_function, a
+    # coroutine doing the same that awaits the functions it calls.
+    def __init__(self, name: str, arity: int, function: object, async_function: object) -> None:
+        super().__init__(name, arity, function)
+        self.async_function = async_function
+
+    def call(self, interpreter: object, arguments: list[object]) -> object:
+        return LoxNative.to_lox(self.name,
+                                self.function(interpreter, *[LoxRope.flatten(argument) for argument in arguments]))
+
+    async def call_async(self, interpreter: object, arguments: list[object]) -> object:
+        return LoxNative.to_lox(self.name, await self.async_function(
+            interpreter, *[LoxRope.flatten(argument) for argument in arguments]))
+
+
+class LoxNativeMethod:
+    # A method of a built-in class implemented by a Python function taking
+    # the instance first. Like LoxFunction it is bound to an instance when
+    # looked up, which makes it an ordinary LoxNative, or a
+    # LoxCallbackNative when there is an async_function.
+    def __init__(self, name: str, arity: int, function: object, async_function: object = None) -> None:
+        self.name = name
+        self.native_arity = arity
+        self.function = function
+        self.async_function = async_function
+
+    def arity(self) -> int:
+        return self.native_arity
+
+    def bind(self, instance: object) -> LoxNative:
+        if self.async_function is not None:
+            return LoxCallbackNative(self.name, self.native_arity, self.function.__get__(instance),
+                                     self.async_function.__get__(instance))
+        return LoxNative(self.name, self.native_arity, self.function.__get__(instance))
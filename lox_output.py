@@ -0,0 +1,77 @@
+import sys
+from abc import ABC, abstractmethod
+
+
+class OutputSink(ABC):
+    # Where 'print' output and reported errors go, one line at a time.
+
+    @abstractmethod
+    def write_line(self, text: str) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    @staticmethod
+    def of(output: object, buffer_size: int = None) -> "OutputSink":
+        # Sinks are used as they are, anything else is a stream to write to,
+        # None being whatever sys.stdout is at the time.
+        if isinstance(output, OutputSink):
+            return output
+        return BufferedSink(output, buffer_size)
+
+
+class BufferedSink(OutputSink):
+    # Collects lines and writes them to the stream in one call once
+    # buffer_size characters are pending, and on flush(). A buffer_size of 0
+    # writes every line. None buffers unless the stream is a terminal, where
+    # lines should show up as they are printed.
+    DEFAULT_BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, stream: object = None, buffer_size: int = None) -> None:
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.pending = []
+        self.size = 0
+
+    def write_line(self, text: str) -> None:
+        self.pending.append(text)
+        self.size += len(text) + 1
+        if self.buffer_size is None:
+            self.buffer_size = 0 if self.target().isatty() else BufferedSink.DEFAULT_BUFFER_SIZE
+        if self.size >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self.pending:
+            return
+        stream = self.target()
+        self.pending.append("")
+        stream.write("\n".join(self.pending))
+        stream.flush()
+        self.pending = []
+        self.size = 0
+
+    def target(self) -> object:
+        return sys.stdout if self.stream is None else self.stream
+
+
+class CaptureSink(OutputSink):
+    # Keeps everything in memory, for embedders and tests.
+    def __init__(self) -> None:
+        self.lines = []
+
+    def write_line(self, text: str) -> None:
+        self.lines.append(text)
+
+    def getvalue(self) -> str:
+        return "".join(line + "\n" for line in self.lines)
+
+
+class CallbackSink(OutputSink):
+    # Hands every line to a Python function as soon as it is written.
+    def __init__(self, callback: object) -> None:
+        self.callback = callback
+
+    def write_line(self, text: str) -> None:
+        self.callback(text)
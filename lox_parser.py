@@ -1,9 +1,10 @@
 from lox_token import Token, TokenType
 from lox_error import LoxError, ParseError
 from expr import Binary, Literal, Grouping, Variable, Expr, \
-                 Assign, Logical, Call, Get, Set, This, Super
+                 Assign, Logical, Call, Get, Set, This, Super, Unary, \
+                 Index, IndexSet
 from stmt import Print, Expression, Stmt, Var, Block, If, \
-                 While, Function, Return, Class
+                 While, Function, Return, Class, Import
 
 class LoxParser:
     def __init__(self, tokens:[Token], lox_error: LoxError) -> None:
@@ -21,18 +22,23 @@ class LoxParser:
         return self.assignment()
     
     def declaration(self) -> Stmt:
+        line = self.peek().line
         try:
             if self.match(TokenType.CLASS):
-                return self.class_declaration()
-            if self.match(TokenType.FUN):
-                return self.stmt_function("function")
-            if self.match(TokenType.VAR):
-                return self.var_declaration()
+                stmt = self.class_declaration()
+            elif self.match(TokenType.FUN):
+                stmt = self.stmt_function("function")
+            elif self.match(TokenType.VAR):
+                stmt = self.var_declaration()
+            elif self.match(TokenType.IMPORT):
+                stmt = self.import_declaration()
             else:
                 return self.statement()
         except ParseError as error:
             self.synchronize()
             return None
+        stmt.line = line
+        return stmt
     
     def class_declaration(self):
         name = self.consume(TokenType.IDENTIFIER, "Expect class name.")
@@ -52,23 +58,33 @@ class LoxParser:
 
         return Class(name, super_class, methods)
 
+    def import_declaration(self) -> Stmt:
+        keyword = self.previous()
+        path = self.consume(TokenType.STRING, "Expect module path after 'import'.")
+        self.consume(TokenType.SEMICOLON, "Expect ';' after module path.")
+        return Import(keyword, path)
+
     def statement(self):
+        line = self.peek().line
         if self.match(TokenType.FOR):
-            return self.for_statement()
-        if self.match(TokenType.IF):
-            return self.if_statement()
+            stmt = self.for_statement()
+        elif self.match(TokenType.IF):
+            stmt = self.if_statement()
         elif self.match(TokenType.PRINT):
-            return self.print_statement()
+            stmt = self.print_statement()
         elif self.match(TokenType.RETURN):
-            return self.return_statement()
+            stmt = self.return_statement()
         elif self.match(TokenType.WHILE):
-            return self.while_statement()
+            stmt = self.while_statement()
         elif self.match(TokenType.LEFT_BRACE):
-            return Block(self.block())
+            stmt = Block(self.block())
         else:
-            return self.expression_statement()
+            stmt = self.expression_statement()
+        stmt.line = line
+        return stmt
         
     def for_statement(self) -> Stmt:
+        keyword = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
 
         if self.match(TokenType.SEMICOLON):
@@ -95,7 +111,7 @@ class LoxParser:
         
         if not condition:
             condition = Literal(True)
-        body = While(condition, body)
+        body = While(keyword, condition, body)
 
         if inilitializer:
             body = Block([inilitializer, body])
@@ -138,12 +154,13 @@ class LoxParser:
         return Var(name, initializer)
 
     def while_statement(self):
+        keyword = self.previous()
         self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
         condition = self.expression()
         self.consume(TokenType.RIGHT_PAREN, "Expect ')' after condition.")
         body = self.statement()
 
-        return While(condition, body)
+        return While(keyword, condition, body)
     
     def expression_statement(self):
         expr = self.expression()
@@ -189,6 +206,8 @@ class LoxParser:
                 return Assign(name, value)
             elif isinstance(expr, Get):
                 return Set(expr.object, expr.name, value)
+            elif isinstance(expr, Index):
+                return IndexSet(expr.object, expr.bracket, expr.index, value)
             else:
                 self.error(equals, "Invalid assignment target.")
         return expr
@@ -281,7 +300,7 @@ class LoxParser:
         if self.match(TokenType.BANG, TokenType.MINUS):
             operator = self.previous()
             right = self.unary()
-            return Binary(operator, right)
+            return Unary(operator, right)
         
         return self.call()
     
@@ -301,6 +320,11 @@ class LoxParser:
 
         return Call(callee, paren, arguments)
     
+    def finish_index(self, obj: Expr) -> Expr:
+        index = self.expression()
+        bracket = self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after index.")
+        return Index(obj, bracket, index)
+
     def call(self):
         expr = self.primary()
 
@@ -310,6 +334,8 @@ class LoxParser:
             elif self.match(TokenType.DOT):
                 name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'")
                 expr = Get(expr, name)
+            elif self.match(TokenType.LEFT_BRACKET):
+                expr = self.finish_index(expr)
             else:
                 break
 
@@ -353,7 +379,7 @@ class LoxParser:
     def synchronize(self):
         statement_keywords = [TokenType.CLASS, TokenType.FOR, TokenType.FUN, \
                               TokenType.IF, TokenType.PRINT, TokenType.RETURN,\
-                              TokenType.VAR,  TokenType.WHILE]
+                              TokenType.VAR,  TokenType.WHILE, TokenType.IMPORT]
         self.advance()
         while not self.is_at_end():
             if self.previous().token_type == TokenType.SEMICOLON:
@@ -0,0 +1,210 @@
+import mmap
+import os
+
+from environment import GlobalEnvironment
+from lox_error import LoxError
+from lox_budget import Budget
+from lox_native import LoxNative
+from scanner import Scanner, ByteScanner
+from pratt_parser import PrattParser
+from interpreter import Interpreter
+from async_interpreter import AsyncInterpreter
+from resolver import Resolver
+from loop_analyzer import LoopAnalyzer
+from type_inferrer import TypeInferrer
+from lox_image import Image
+from stmt import Var, Function, Class, Import
+
+
+class RunResult:
+    def __init__(self, interpreter: Interpreter, lox_error: LoxError) -> None:
+        self.interpreter = interpreter
+        self.diagnostics = lox_error.diagnostics
+
+    @property
+    def ok(self) -> bool:
+        return not self.diagnostics
+
+    def get(self, name: str) -> object:
+        # value of a global after the run
+        lox_globals = self.interpreter.lox_globals
+        slot = lox_globals.slots.get(name, None)
+        if slot is None or lox_globals.values[slot] is GlobalEnvironment.UNDEFINED:
+            raise KeyError(name)
+        return lox_globals.values[slot]
+
+
+class Program:
+    # A scanned, parsed and resolved program. Nothing in it changes after
+    # compile(), so one Program can serve any number of runs, including
+    # concurrent ones: each run gets its own Interpreter and globals.
+    def __init__(self, statements: list, diagnostics: list, interpreter: Interpreter,
+                 type_report: str, imports: list = (), image: Image = None) -> None:
+        self.statements = statements
+        self.diagnostics = diagnostics
+        self.interpreter = interpreter
+        self.type_report = type_report
+        # (path, Program) of every module imported at the top level
+        self.imports = imports
+        # the Image runs start from, see lox_image
+        self.image = image
+        # globals an importer gets: everything defined or imported at the top level
+        self.exports = []
+        for statement in statements:
+            if isinstance(statement, (Var, Function, Class)):
+                names = [statement.name.lexeme]
+            elif isinstance(statement, Import) and statement.module is not None:
+                names = statement.module.exports
+            else:
+                continue
+            for name in names:
+                if name not in self.exports:
+                    self.exports.append(name)
+
+    @property
+    def ok(self) -> bool:
+        return not self.diagnostics
+
+    def run(self, globals: dict = None, stdout: object = None, lox_error: LoxError = None,
+            budget: Budget = None, interpreter_class: type = Interpreter) -> RunResult:
+        # interpreter_class may be an instrumented subclass of Interpreter
+        interpreter, lox_error = self.start(interpreter_class, globals, stdout, lox_error, budget)
+        interpreter.interpret(self.statements)
+        return RunResult(interpreter, lox_error)
+
+    async def run_async(self, globals: dict = None, stdout: object = None, lox_error: LoxError = None,
+                        budget: Budget = None) -> RunResult:
+        # Like run(), but async natives in globals may be awaited; run many
+        # of these with asyncio.gather() to interleave scripts on one loop.
+        interpreter, lox_error = self.start(AsyncInterpreter, globals, stdout, lox_error, budget)
+        await interpreter.interpret(self.statements)
+        return RunResult(interpreter, lox_error)
+
+    def start(self, interpreter_class: type, globals: dict, stdout: object, lox_error: LoxError,
+              budget: Budget) -> tuple:
+        if not self.ok:
+            raise ValueError("can't run a program that failed to compile")
+        if lox_error is None:
+            lox_error = LoxError(stdout, echo=False)
+
+        interpreter = self.interpreter.fork(lox_error, stdout, interpreter_class)
+        if self.image is not None:
+            interpreter.lox_globals = self.image.globals(self.interpreter.lox_globals)
+            interpreter.environment = interpreter.lox_globals
+        if budget is not None:
+            interpreter.budget = budget.start()
+        for name, value in (globals or {}).items():
+            # The TypeInferrer only saw the program's own stores to its
+            # globals, a host value read before the program's definition
+            # could break an operation it proved.
+            if name in self.exports:
+                raise ValueError(f"can't pass global '{name}', the program defines it")
+            interpreter.lox_globals.define(name, LoxNative.to_lox(name, value))
+        return interpreter, lox_error
+
+
+def compile(source: object, lox_error: LoxError = None, path: str = None,
+            image: Image = None) -> Program:
+    # Scans, parses and resolves source once, a str or UTF-8 bytes, mmap
+    # included. Errors are collected in Program.diagnostics instead of being
+    # printed, unless lox_error says so. Imports are relative to the
+    # directory of path, or to the current directory. Runs start from the
+    # globals saved in image when given, and from just the natives otherwise.
+    if lox_error is None:
+        lox_error = LoxError(echo=False)
+    first_diagnostic = len(lox_error.diagnostics)
+
+    if isinstance(source, str):
+        tokens = Scanner(source, lox_error).scan_tokens()
+    else:
+        tokens = ByteScanner(source, lox_error).scan_tokens()
+    parser = PrattParser(tokens, lox_error)
+
+    interpreter = Interpreter(lox_error)
+    if image is not None:
+        interpreter.lox_globals = image.template()
+        interpreter.environment = interpreter.lox_globals
+    type_report = None
+    imports = []
+    try:
+        statements = parser.parse()
+        if not lox_error.had_error:
+            Resolver(interpreter, lox_error).resolve_block(statements)
+            imports = load_modules(statements, os.path.dirname(path) if path else os.getcwd(), lox_error)
+        if not lox_error.had_error:
+            LoopAnalyzer(interpreter).analyze(statements)
+            type_inferrer = TypeInferrer(interpreter)
+            type_inferrer.infer(statements)
+            type_report = type_inferrer.report()
+    except RecursionError:
+        # the parser and the passes recurse on nested source, past Python's
+        # recursion limit for source nested hundreds deep
+        lox_error.error(parser.peek().line, "Source nested too deeply.")
+        statements = []
+        type_report = None
+
+    return Program(statements, lox_error.diagnostics[first_diagnostic:], interpreter, type_report, imports, image)
+
+
+def load_modules(statements: list, directory: str, lox_error: LoxError) -> list:
+    # Compiles the module of every top-level import through compile_file,
+    # so each is compiled once per process however many programs import it.
+    imports = []
+    for statement in statements:
+        if not isinstance(statement, Import):
+            continue
+        path = os.path.normpath(os.path.join(directory, statement.path.literal))
+        if path in loading:
+            lox_error.error(statement.keyword.line, f"Import cycle through '{statement.path.literal}'.")
+            continue
+        try:
+            module = compile_file(path)
+        except OSError as e:
+            lox_error.error(statement.keyword.line, f"Can't open module '{statement.path.literal}': {e.strerror}.")
+            continue
+        if not module.ok:
+            for diagnostic in module.diagnostics:
+                lox_error.add(diagnostic)
+            lox_error.error(statement.keyword.line, f"Module '{statement.path.literal}' has errors.")
+            continue
+        statement.module = module
+        imports.append((path, module))
+    return imports
+
+
+# Programs compiled by compile_file, by path, with the file's mtime and size.
+# A worker process that is handed the same script again skips compiling it.
+compiled = {}
+# paths being compiled, to catch import cycles
+loading = set()
+
+# Files from this size on are scanned straight from the page cache instead
+# of being read and decoded up front.
+MMAP_THRESHOLD = 1024 * 1024
+
+
+def compile_file(path: str, image: Image = None) -> Program:
+    # Raises OSError when the file can't be read. A cached program is only
+    # reused while the modules it imported are unchanged too. Programs
+    # starting from an image are not cached.
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = compiled.get(path, None) if image is None else None
+    if cached is not None and cached[0] == version \
+            and all(compile_file(module_path) is module for module_path, module in cached[1].imports):
+        return cached[1]
+
+    loading.add(path)
+    try:
+        if stat.st_size >= MMAP_THRESHOLD:
+            with open(path, 'rb') as reader, mmap.mmap(reader.fileno(), 0, access=mmap.ACCESS_READ) as source:
+                program = compile(source, path=path, image=image)
+        else:
+            with open(path, 'r') as reader:
+                program = compile(reader.read(), path=path, image=image)
+    finally:
+        loading.discard(path)
+    if image is None:
+        compiled[path] = (version, program)
+    return program
@@ -0,0 +1,57 @@
+class LoxRope:
+    # Lazy string produced by Lox '+' on strings. Concatenation only links the
+    # two halves together, the actual Python str is built once on flatten().
+    # Short results are not worth a node and are concatenated eagerly.
+    FLAT_THRESHOLD = 64
+
+    __slots__ = ("left", "right", "length", "flat")
+
+    def __init__(self, left: object, right: object, length: int) -> None:
+        self.left = left
+        self.right = right
+        self.length = length
+        self.flat = None
+
+    @staticmethod
+    def concat(left: object, right: object) -> object:
+        length = len(left) + len(right)
+        if length <= LoxRope.FLAT_THRESHOLD:
+            return LoxRope.flatten(left) + LoxRope.flatten(right)
+        return LoxRope(left, right, length)
+
+    @staticmethod
+    def flatten(value: object) -> object:
+        if isinstance(value, LoxRope):
+            return value.to_str()
+        return value
+
+    def to_str(self) -> str:
+        if self.flat is not None:
+            return self.flat
+
+        # Walk the tree left to right with an explicit stack, long chains of
+        # 's = s + piece' are far deeper than Python's recursion limit.
+        pieces = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, LoxRope):
+                if node.flat is not None:
+                    pieces.append(node.flat)
+                else:
+                    stack.append(node.right)
+                    stack.append(node.left)
+            else:
+                pieces.append(node)
+
+        self.flat = "".join(pieces)
+        # The children are no longer needed once the text is cached.
+        self.left = self.flat
+        self.right = ""
+        return self.flat
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __str__(self) -> str:
+        return self.to_str()
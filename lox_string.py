@@ -0,0 +1,120 @@
+import re
+
+from lox_list import LoxList
+from lox_native import LoxNative, NativeError
+
+
+# Native string functions, defined as globals by every Interpreter:
+#   len(s), charAt(s, i), substr(s, start, end), indexOf(s, part),
+#   split(s, separator), join(list, separator), replace(s, old, new),
+#   upper(s), lower(s), toNumber(s), toString(value)
+# Strings reach them flattened to str, and indexes are whole numbers
+# counted from 0, like a List's.
+
+NUMBER = re.compile(r"-?[0-9]+(\.[0-9]+)?")
+
+
+def stringify(value: object) -> str:
+    # how print shows a value
+    if value is None:
+        return "nil"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+
+    text = str(value)
+    if isinstance(value, float) and text.endswith(".0"):
+        text = text[:-2]
+
+    return text
+
+
+def string(value: object, function: str) -> str:
+    if not isinstance(value, str):
+        raise NativeError(f"{function}() expects a string, got {stringify(value)}.")
+    return value
+
+
+def position(index: object, last: int) -> int:
+    # index as an int, last being the largest one allowed
+    if not isinstance(index, float) or not index.is_integer():
+        raise NativeError("String index must be a whole number.")
+    if not 0 <= index <= last:
+        raise NativeError("String index out of range.")
+    return int(index)
+
+
+def length(text: object) -> float:
+    return float(len(string(text, "len")))
+
+
+def char_at(text: object, index: object) -> str:
+    text = string(text, "charAt")
+    return text[position(index, len(text) - 1)]
+
+
+def substr(text: object, start: object, end: object) -> str:
+    # from start up to but not including end
+    text = string(text, "substr")
+    start = position(start, len(text))
+    return text[start:position(end, len(text))]
+
+
+def index_of(text: object, part: object) -> float:
+    # -1 when part isn't in text
+    return float(string(text, "indexOf").find(string(part, "indexOf")))
+
+
+def split(text: object, separator: object) -> LoxList:
+    # an empty separator splits text into its characters
+    text = string(text, "split")
+    separator = string(separator, "split")
+    return LoxList.of(text.split(separator) if separator else list(text))
+
+
+def join(values: object, separator: object) -> str:
+    # elements that aren't strings are joined as print shows them
+    if not isinstance(values, LoxList):
+        raise NativeError(f"join() expects a list, got {stringify(values)}.")
+    return string(separator, "join").join(
+        value if isinstance(value, str) else stringify(value) for value in values.values)
+
+
+def replace(text: object, old: object, new: object) -> str:
+    # every occurrence
+    return string(text, "replace").replace(string(old, "replace"), string(new, "replace"))
+
+
+def upper(text: object) -> str:
+    return string(text, "upper").upper()
+
+
+def lower(text: object) -> str:
+    return string(text, "lower").lower()
+
+
+def to_number(value: object) -> object:
+    # A string written like a Lox number, optionally negative and surrounded
+    # by whitespace, as a number; nil for any other string.
+    if isinstance(value, float):
+        return value
+    text = string(value, "toNumber").strip()
+    return float(text) if NUMBER.fullmatch(text) else None
+
+
+def to_string(value: object) -> str:
+    return stringify(value)
+
+
+STRING_NATIVES = [LoxNative.wrap(name, function) for name, function in (
+    ("len", length),
+    ("charAt", char_at),
+    ("substr", substr),
+    ("indexOf", index_of),
+    ("split", split),
+    ("join", join),
+    ("replace", replace),
+    ("upper", upper),
+    ("lower", lower),
+    ("toNumber", to_number),
+    ("toString", to_string),
+)]
@@ -8,6 +8,8 @@ class TokenType(Enum):
     RIGHT_PAREN = ')', 
     LEFT_BRACE = '{'
     RIGHT_BRACE = '}'
+    LEFT_BRACKET = '['
+    RIGHT_BRACKET = ']'
     COMMA = ','
     DOT = '.'
     MINUS = '-'
@@ -40,6 +42,7 @@ class TokenType(Enum):
     FUN = 'fun'
     FOR = 'for' 
     IF = 'if' 
+    IMPORT = 'import'
     NIL = 'nil' 
     OR = 'or'
     PRINT = 'print' 
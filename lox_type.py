@@ -0,0 +1,32 @@
+from enum import Enum
+
+
+class LoxType(Enum):
+    # Static types used by the TypeInferrer. UNKNOWN means any value.
+    NUMBER = "number"
+    STRING = "string"
+    BOOL = "bool"
+    NIL = "nil"
+    INSTANCE = "instance"
+    UNKNOWN = "unknown"
+
+    @staticmethod
+    def join(a: object, b: object) -> object:
+        # None is "no value seen yet".
+        if a is None:
+            return b
+        if b is None or a is b:
+            return a
+        return LoxType.UNKNOWN
+
+    @staticmethod
+    def of(value: object) -> object:
+        if value is None:
+            return LoxType.NIL
+        if isinstance(value, bool):
+            return LoxType.BOOL
+        if isinstance(value, float):
+            return LoxType.NUMBER
+        if isinstance(value, str):
+            return LoxType.STRING
+        return LoxType.UNKNOWN
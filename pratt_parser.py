@@ -0,0 +1,141 @@
+from lox_token import Token, TokenType
+from lox_parser import LoxParser
+from expr import Binary, Literal, Grouping, Variable, Expr, \
+                 Assign, Logical, Get, Set, This, Super, Unary, \
+                 Index, IndexSet
+
+
+class Precedence:
+    NONE = 0
+    ASSIGNMENT = 1
+    OR = 2
+    AND = 3
+    EQUALITY = 4
+    COMPARISON = 5
+    TERM = 6
+    FACTOR = 7
+    UNARY = 8
+    CALL = 9
+
+
+class PrattParser(LoxParser):
+    # Parses expressions by precedence climbing over the PREFIX and INFIX
+    # tables instead of one method per precedence level. Statements and
+    # assignment are parsed by LoxParser, and the ASTs and errors are the
+    # same as LoxParser's, see tool/parse_benchmark.py.
+
+    def assignment(self) -> Expr:
+        # LoxParser.assignment with everything below it parsed here
+        expr = self.parse_precedence(Precedence.OR)
+
+        if self.match(TokenType.EQUAL):
+            equals = self.previous()
+            value = self.assignment()
+
+            if isinstance(expr, Variable):
+                return Assign(expr.name, value)
+            elif isinstance(expr, Get):
+                return Set(expr.object, expr.name, value)
+            elif isinstance(expr, Index):
+                return IndexSet(expr.object, expr.bracket, expr.index, value)
+            else:
+                self.error(equals, "Invalid assignment target.")
+        return expr
+
+    def parse_precedence(self, precedence: int) -> Expr:
+        token = self.tokens[self.current]
+        prefix = PrattParser.PREFIX.get(token.token_type, None)
+        if prefix is None:
+            raise self.error(token, "Expect expression.")
+        # EOF has no rules, so this never moves past the end
+        self.current += 1
+        expr = prefix(self, token)
+
+        tokens = self.tokens
+        while True:
+            token = tokens[self.current]
+            rule = PrattParser.INFIX.get(token.token_type, None)
+            if rule is None or rule[1] < precedence:
+                return expr
+            self.current += 1
+            expr = rule[0](self, expr, token)
+
+    def parse_literal(self, token: Token) -> Expr:
+        if token.token_type == TokenType.FALSE:
+            return Literal(False)
+        elif token.token_type == TokenType.TRUE:
+            return Literal(True)
+        elif token.token_type == TokenType.NIL:
+            return Literal(None)
+        return Literal(token.literal)
+
+    def parse_variable(self, token: Token) -> Expr:
+        return Variable(token)
+
+    def parse_this(self, token: Token) -> Expr:
+        return This(token)
+
+    def parse_super(self, token: Token) -> Expr:
+        self.consume(TokenType.DOT, "Expect '.' after 'super'.")
+        method = self.consume(TokenType.IDENTIFIER, "Expect superclass method name.")
+        return Super(token, method)
+
+    def parse_grouping(self, token: Token) -> Expr:
+        expr = self.expression()
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+        return Grouping(expr)
+
+    def parse_unary(self, token: Token) -> Expr:
+        return Unary(token, self.parse_precedence(Precedence.UNARY))
+
+    def parse_binary(self, left: Expr, token: Token) -> Expr:
+        # left associative: the right operand binds one level tighter
+        right = self.parse_precedence(PrattParser.INFIX[token.token_type][1] + 1)
+        return Binary(left, token, right)
+
+    def parse_logical(self, left: Expr, token: Token) -> Expr:
+        right = self.parse_precedence(PrattParser.INFIX[token.token_type][1] + 1)
+        return Logical(left, token, right)
+
+    def parse_call(self, left: Expr, token: Token) -> Expr:
+        return self.finish_call(left)
+
+    def parse_get(self, left: Expr, token: Token) -> Expr:
+        name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'")
+        return Get(left, name)
+
+    def parse_index(self, left: Expr, token: Token) -> Expr:
+        return self.finish_index(left)
+
+    PREFIX = {
+        TokenType.FALSE: parse_literal,
+        TokenType.TRUE: parse_literal,
+        TokenType.NIL: parse_literal,
+        TokenType.NUMBER: parse_literal,
+        TokenType.STRING: parse_literal,
+        TokenType.IDENTIFIER: parse_variable,
+        TokenType.THIS: parse_this,
+        TokenType.SUPER: parse_super,
+        TokenType.LEFT_PAREN: parse_grouping,
+        TokenType.BANG: parse_unary,
+        TokenType.MINUS: parse_unary,
+    }
+
+    # token type -> (parse method, precedence)
+    INFIX = {
+        TokenType.OR: (parse_logical, Precedence.OR),
+        TokenType.AND: (parse_logical, Precedence.AND),
+        TokenType.BANG_EQUAL: (parse_binary, Precedence.EQUALITY),
+        TokenType.EQUAL_EQUAL: (parse_binary, Precedence.EQUALITY),
+        TokenType.GREATER: (parse_binary, Precedence.COMPARISON),
+        TokenType.GREATER_EQUAL: (parse_binary, Precedence.COMPARISON),
+        TokenType.LESS: (parse_binary, Precedence.COMPARISON),
+        TokenType.LESS_EQUAL: (parse_binary, Precedence.COMPARISON),
+        TokenType.MINUS: (parse_binary, Precedence.TERM),
+        TokenType.PLUS: (parse_binary, Precedence.TERM),
+        TokenType.SLASH: (parse_binary, Precedence.FACTOR),
+        TokenType.STAR: (parse_binary, Precedence.FACTOR),
+        TokenType.LEFT_PAREN: (parse_call, Precedence.CALL),
+        TokenType.DOT: (parse_get, Precedence.CALL),
+        TokenType.LEFT_BRACKET: (parse_index, Precedence.CALL),
+    }
@@ -1,13 +1,14 @@
 from enum import Enum
 
 from interpreter import Interpreter
+from environment import VariableKind, Layout
 from lox_token import Token
 from lox_error import LoxError
 from expr import ExprVisitor, Literal, Grouping, Expr, Unary, \
                  Binary, Variable, Assign, Logical, Call, Get, Set, \
-                 This, Super
+                 This, Super, Index, IndexSet
 from stmt import StmtVisitor, Stmt, Expression, Print, Var, Block, \
-                 If, While, Function, Return, Class
+                 If, While, Function, Return, Class, Import
 
 
 class FunctionType(Enum):
@@ -21,11 +22,46 @@ class ClassType(Enum):
     SUBCLASS = "subclass"
     CLASS = "class"
 
+class Local:
+    # A variable declared in a local scope. Slots and accesses are only handed
+    # to the interpreter once the Environment holding the variable is known to
+    # be complete, and whether a closure captured the variable.
+    def __init__(self, scope: object, name: str) -> None:
+        self.scope = scope
+        self.name = name
+        self.slot = 0
+        self.defined = False
+        self.captured = False
+        self.accesses = []
+        self.captures = []
+
+class Scope:
+    # A block, function or 'super' scope. A block none of whose variables are
+    # captured is flat: it gets no Environment of its own and its variables
+    # take extra slots in the nearest enclosing scope that has one.
+    def __init__(self, parent: object, can_flatten: bool) -> None:
+        self.parent = parent
+        self.can_flatten = can_flatten
+        self.names = {}
+        self.flat = False
+        self.flat_children = []
+
+class FunctionScope:
+    # base is the index in Resolver.scopes of the function's own scope,
+    # upvalues lists the cells the function captures as (is_local, depth, slot).
+    def __init__(self, base: int) -> None:
+        self.base = base
+        self.upvalues = []
+        self.upvalue_names = []
+        self.upvalue_index = {}
+
 class Resolver(ExprVisitor, StmtVisitor):
 
     def __init__(self, interpreter: Interpreter, lox_error: LoxError) -> None:
         self.interpreter = interpreter
         self.scopes = []
+        # the top-level script acts as the outermost function
+        self.functions = [FunctionScope(0)]
         self.current_function = FunctionType.Null
         self.current_class = ClassType.Null
         self.lox_error = lox_error
@@ -42,56 +78,148 @@ class Resolver(ExprVisitor, StmtVisitor):
     def resolve_function(self, fun: Function, type: FunctionType) -> None:
         enclosing_function = self.current_function
         self.current_function = type
-        self.begin_scope()
+        self.functions.append(FunctionScope(len(self.scopes)))
+        self.begin_scope(None)
+        if type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            # 'this' is always slot 0 of a method
+            self.declare_name("this").defined = True
         for param in fun.params:
             self.declare(param)
             self.define(param)
         self.resolve_block(fun.body)
-        self.end_scope()
+        layout = self.end_scope()
+        function_scope = self.functions.pop()
+        # entries for cells of enclosing locals are filled in by finish_scope
+        layout.upvalues = function_scope.upvalues
+        layout.upvalue_names = tuple(function_scope.upvalue_names)
+        self.interpreter.resolve_layout(fun, layout)
         self.current_function = enclosing_function
     
-    def begin_scope(self) -> None:
-        self.scopes.append({})
+    def begin_scope(self, parent: Scope, can_flatten: bool = False) -> None:
+        self.scopes.append(Scope(parent, can_flatten))
     
-    def end_scope(self) -> None:
-        self.scopes.pop()
+    def end_scope(self) -> Layout:
+        # Returns None for a flat scope.
+        scope = self.scopes.pop()
+        if scope.can_flatten and not any(local.captured for local in scope.names.values()):
+            scope.flat = True
+            scope.parent.flat_children.append(scope)
+            return None
+        return self.finish_scope(scope)
+
+    def finish_scope(self, scope: Scope) -> Layout:
+        # scope owns an Environment: number its slots, its own variables first
+        # and then those of every flat scope folded into it.
+        variables = []
+        pending = [scope]
+        while pending:
+            current = pending.pop(0)
+            variables.extend(current.names.values())
+            pending.extend(current.flat_children)
+
+        cells = []
+        for slot, local in enumerate(variables):
+            local.slot = slot
+            kind = VariableKind.LOCAL
+            if local.captured:
+                kind = VariableKind.CELL
+                cells.append(slot)
+            for from_scope, node in local.accesses:
+                self.interpreter.resolve(node, kind, self.hops(from_scope, local.scope), slot)
+            for from_scope, upvalues, index in local.captures:
+                upvalues[index] = (True, self.hops(from_scope, local.scope), slot)
+        return Layout(len(variables), tuple(cells), names=tuple(local.name for local in variables))
 
-    def declare(self, name: Token) -> None:
+    def hops(self, from_scope: Scope, to_scope: Scope) -> int:
+        # number of Environments walked from from_scope to reach to_scope
+        depth = 0
+        while from_scope is not to_scope:
+            if not from_scope.flat:
+                depth += 1
+            from_scope = from_scope.parent
+        return depth
+
+    def declare_name(self, name: str) -> Local:
+        scope = self.scopes[-1]
+        local = scope.names.get(name, None)
+        if local is None:
+            local = Local(scope, name)
+            scope.names[name] = local
+        return local
+
+    def declare(self, name: Token, stmt: Stmt = None) -> None:
+        # stmt is the declaration that stores the initial value
         if self.scopes:
             scope = self.scopes[-1]
-            if name.lexeme in scope:
-                self.lox_error.error(name, "Already a variable with this name in this scope.")
-            scope[name.lexeme] = False
+            if name.lexeme in scope.names:
+                self.lox_error.error(name.line, "Already a variable with this name in this scope.")
+            local = self.declare_name(name.lexeme)
+            if stmt is not None:
+                local.accesses.append((scope, stmt))
         else:
             return None
             
     def define(self, name: Token) -> None:
         if self.scopes:
-            self.scopes[-1][name.lexeme] = True
+            self.scopes[-1].names[name.lexeme].defined = True
         else:
             return None
             
     
     def resolve_local(self, expr: Expr, name: Token) -> None:
+        self.resolve_name(expr, name.lexeme)
+
+    def resolve_name(self, expr: Expr, name: str) -> None:
         # variable in current scope 0
         # variable in enclosing scope 1
         # variable not found means it is global
         # decrement len(self.scopes) - 1 >= i >= 0
         for i in range(len(self.scopes)-1, -1, -1):
-            if name.lexeme in self.scopes[i]:
-                self.interpreter.resolve(expr, len(self.scopes) - 1 - i)
-                return None
+            local = self.scopes[i].names.get(name, None)
+            if local is None:
+                continue
+            if i >= self.functions[-1].base:
+                local.accesses.append((self.scopes[-1], expr))
+            else:
+                # declared in an enclosing function, reach it through a cell
+                local.captured = True
+                index = self.resolve_upvalue(len(self.functions) - 1, i, local)
+                self.interpreter.resolve(expr, VariableKind.UPVALUE, 0, index)
+            return None
+        # globals get a slot in the flat global table, it may be defined later
+        self.interpreter.resolve_global(expr, name)
+
+    def resolve_upvalue(self, function: int, scope: int, local: Local) -> int:
+        function_scope = self.functions[function]
+        index = function_scope.upvalue_index.get(local, None)
+        if index is not None:
+            return index
+
+        index = len(function_scope.upvalues)
+        function_scope.upvalue_names.append(local.name)
+        if scope >= self.functions[function - 1].base:
+            # local of the enclosing function, counted from the scope the
+            # closure is created in once its slot is known
+            function_scope.upvalues.append(None)
+            local.captures.append((self.scopes[function_scope.base - 1], function_scope.upvalues, index))
+        else:
+            function_scope.upvalues.append((False, 0, self.resolve_upvalue(function - 1, scope, local)))
+        function_scope.upvalue_index[local] = index
+        return index
     
     def visit_block_stmt(self, stmt: Block) -> None:
-        self.begin_scope()
+        parent = self.scopes[-1] if self.scopes else None
+        self.begin_scope(parent, parent is not None)
         self.resolve_block(stmt.statements)
-        self.end_scope()
+        layout = self.end_scope()
+        if layout is not None:
+            self.interpreter.resolve_layout(stmt, layout)
     
     def visit_class_stmt(self, stmt: Class):
         enclosing_class = self.current_class
         self.current_class = ClassType.CLASS
 
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
 
         if stmt.super_class and stmt.name.lexeme == stmt.super_class.name.lexeme:
@@ -102,11 +230,8 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.resolve(stmt.super_class)
         
         if stmt.super_class:
-            self.begin_scope()
-            self.scopes[-1]["super"] = True
-
-        self.begin_scope()
-        self.scopes[-1]["this"] = True
+            self.begin_scope(self.scopes[-1] if self.scopes else None)
+            self.declare_name("super").defined = True
 
         for method in stmt.methods:
             declaration = FunctionType.METHOD
@@ -115,10 +240,8 @@ class Resolver(ExprVisitor, StmtVisitor):
 
             self.resolve_function(method, declaration)
 
-        self.end_scope()
-
         if stmt.super_class:
-            self.end_scope()
+            self.interpreter.resolve_layout(stmt, self.end_scope())
         
         self.current_class = enclosing_class
 
@@ -126,7 +249,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.resolve(stmt.expression)
     
     def visit_function_stmt(self, stmt: Function) -> None:
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
         self.resolve_function(stmt, FunctionType.Function)
 
@@ -136,19 +259,24 @@ class Resolver(ExprVisitor, StmtVisitor):
         if stmt.else_branch is not None:
             self.resolve(stmt.else_branch)
     
+    def visit_import_stmt(self, stmt: Import) -> None:
+        # the module's globals are defined at runtime, like any global
+        if self.scopes:
+            self.lox_error.error(stmt.keyword.line, "Can only import at top level.")
+
     def visit_print_stmt(self, stmt: Print) -> None:
         self.resolve(stmt.expression)
     
     def visit_return_stmt(self, stmt: Return) -> None:
         if self.current_function == FunctionType.Null:
-            self.lox_error.error(stmt.keyword, "Can't return from top-level code.")
+            self.lox_error.error(stmt.keyword.line, "Can't return from top-level code.")
         if stmt.value:
             if self.current_function == FunctionType.INITIALIZER:
-                self.lox_error.error(stmt.keyword.line, "Can't return from top-level code.")
+                self.lox_error.error(stmt.keyword.line, "Can't return a value from an initializer.")
             self.resolve(stmt.value)
 
     def visit_var_stmt(self, stmt: Var) -> None:
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         if stmt.initializer:
             self.resolve(stmt.initializer)
         self.define(stmt.name)
@@ -158,8 +286,9 @@ class Resolver(ExprVisitor, StmtVisitor):
         self.resolve(stmt.body)
     
     def visit_variable_expr(self, expr: Variable) -> None:
-        if self.scopes and self.scopes[-1].get(expr.name.lexeme, None) == False:
-            self.lox_error.error(expr.name, "Can't read local variable in its own initializer")
+        local = self.scopes[-1].names.get(expr.name.lexeme, None) if self.scopes else None
+        if local is not None and not local.defined:
+            self.lox_error.error(expr.name.line, "Can't read local variable in its own initializer")
         self.resolve_local(expr, expr.name)
     
     def visit_assign_expr(self, expr: Assign) -> None:
@@ -178,6 +307,15 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_get_expr(self, expr: Get) -> object:
         self.resolve(expr.object)
     
+    def visit_index_expr(self, expr: Index) -> None:
+        self.resolve(expr.object)
+        self.resolve(expr.index)
+
+    def visit_indexset_expr(self, expr: IndexSet) -> None:
+        self.resolve(expr.object)
+        self.resolve(expr.index)
+        self.resolve(expr.value)
+    
     def visit_grouping_expr(self, expr: Grouping) -> None:
         self.resolve(expr.expression)
     
@@ -199,6 +337,9 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.lox_error.error(expr.keyword.line, "Can't use 'super' in a class with no superclass.")
         
         self.resolve_local(expr, expr.keyword)
+        # the object the method is bound to, an implicit 'this'
+        expr.this = This(expr.keyword)
+        self.resolve_name(expr.this, "this")
     
     def visit_this_expr(self, expr: This):
         if self.current_class == ClassType.Null:
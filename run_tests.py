@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+from lox import Lox
+from lox_error import LoxError
+from lox_output import CaptureSink
+from lox_program import compile_file
+from tests.checks import CHECKS
+
+
+# Expectations written next to the code under test:
+#   print a;  // expect: 1
+#   a();      // expect runtime error: Undefined variable 'a'.
+#   class A < A {}  // [line 1 Error]: A class can't inherit from itself.
+# A golden file tests/name.out next to tests/name.lox takes precedence and
+# must match the whole output.
+EXPECT = re.compile(r"// expect: ?(.*)")
+EXPECT_RUNTIME_ERROR = re.compile(r"// expect runtime error: (.+)")
+EXPECT_ERROR = re.compile(r"// (\[line \d+ Error\].*)")
+
+
+class TestResult:
+    PASS = "PASS"
+    FAIL = "FAIL"
+    RAN = "RAN"   # no expectations, only checked that it does not crash
+
+    def __init__(self, path: str, status: str, elapsed: float, message: str = "") -> None:
+        self.path = path
+        self.status = status
+        self.elapsed = elapsed
+        self.message = message
+
+
+def expected_output(path: str, source: str) -> list[str]:
+    golden = os.path.splitext(path)[0] + ".out"
+    if os.path.exists(golden):
+        with open(golden, 'r') as reader:
+            return reader.read().splitlines()
+
+    expected = []
+    for line_number, line in enumerate(source.splitlines(), 1):
+        match = EXPECT.search(line)
+        if match:
+            expected.append(match.group(1))
+            continue
+        match = EXPECT_RUNTIME_ERROR.search(line)
+        if match:
+            expected.append(match.group(1))
+            expected.append(f"[line: {line_number}]")
+            continue
+        match = EXPECT_ERROR.search(line)
+        if match:
+            expected.append(match.group(1))
+    return expected or None
+
+
+def run_test(path: str) -> TestResult:
+    # Runs in a worker process that imported the interpreter once.
+    with open(path, 'r') as reader:
+        source = reader.read()
+    expected = expected_output(path, source)
+
+    output = io.StringIO()
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            Lox().run_file(path)
+    except BaseException:
+        elapsed = time.perf_counter() - start
+        return TestResult(path, TestResult.FAIL, elapsed, traceback.format_exc())
+    elapsed = time.perf_counter() - start
+
+    if expected is None:
+        return TestResult(path, TestResult.RAN, elapsed)
+
+    actual = output.getvalue().splitlines()
+    if actual != expected:
+        return TestResult(path, TestResult.FAIL, elapsed, difference(expected, actual))
+
+    # The AsyncInterpreter has its own copy of every visitor, which has to
+    # print the same. Scripts without expectations may print different
+    # output on every run, such as clock() timings, and aren't compared.
+    try:
+        async_actual = run_async(path)
+    except BaseException:
+        return TestResult(path, TestResult.FAIL, elapsed, "async run: " + traceback.format_exc())
+    if async_actual is not None and async_actual != actual:
+        return TestResult(path, TestResult.FAIL, elapsed, "async run: " + difference(actual, async_actual))
+    return TestResult(path, TestResult.PASS, elapsed)
+
+
+def run_async(path: str) -> list[str]:
+    # Output of the script run by Program.run_async, None when it doesn't
+    # compile and so never runs.
+    program = compile_file(path)
+    if not program.ok:
+        return None
+    output = CaptureSink()
+    asyncio.run(program.run_async(stdout=output, lox_error=LoxError(output)))
+    return output.getvalue().splitlines()
+
+
+def difference(expected: list[str], actual: list[str]) -> str:
+    for index in range(0, max(len(actual), len(expected))):
+        want = expected[index] if index < len(expected) else "<no more output>"
+        got = actual[index] if index < len(actual) else "<no more output>"
+        if want != got:
+            break
+    return f"output line {index + 1}: expected '{want}' but got '{got}'"
+
+
+def run_check(name: str) -> TestResult:
+    check = next(check for check in CHECKS if check.__name__ == name)
+    start = time.perf_counter()
+    try:
+        check()
+    except BaseException:
+        return TestResult(f"tests/checks.py::{name}", TestResult.FAIL, time.perf_counter() - start,
+                          traceback.format_exc())
+    return TestResult(f"tests/checks.py::{name}", TestResult.PASS, time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run Lox test scripts and check their output.")
+    parser.add_argument("paths", nargs="*", help="test files or directories (default: tests/)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="worker processes")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list passing tests too")
+    args = parser.parse_args()
+
+    paths = []
+    for path in args.paths or [os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests")]:
+        if os.path.isdir(path):
+            paths.extend(sorted(glob.glob(os.path.join(path, "**", "*.lox"), recursive=True)))
+        else:
+            paths.append(path)
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        chunksize = max(1, len(paths) // (args.jobs * 8))
+        results = list(executor.map(run_test, paths, chunksize=chunksize))
+        if not args.paths:
+            results.extend(executor.map(run_check, [check.__name__ for check in CHECKS]))
+    elapsed = time.perf_counter() - start
+
+    counts = {TestResult.PASS: 0, TestResult.FAIL: 0, TestResult.RAN: 0}
+    for result in results:
+        counts[result.status] += 1
+        if result.status == TestResult.FAIL or args.verbose:
+            print(f"{result.status} {os.path.relpath(result.path)} ({result.elapsed * 1000:.1f} ms)")
+        if result.message:
+            print("    " + result.message.rstrip().replace("\n", "\n    "))
+
+    slowest = sorted(results, key=lambda result: result.elapsed, reverse=True)[:3]
+    if slowest:
+        print("slowest: " + ", ".join(f"{os.path.basename(r.path)} {r.elapsed * 1000:.1f} ms" for r in slowest))
+    print(f"{counts[TestResult.PASS]} passed, {counts[TestResult.FAIL]} failed, "
+          f"{counts[TestResult.RAN]} without expectations, in {elapsed:.2f} s")
+    return 1 if counts[TestResult.FAIL] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,21 @@ from lox_error import LoxError
 
 
 class Scanner:
-    def __init__(self, source: str, lox_error: LoxError) -> None:
+    NEWLINE = '\n'
+    QUOTE = '"'
+
+    def __init__(self, source: str, lox_error: LoxError, strings: dict = None) -> None:
         self.source = source
         self.tokens = []
         self.lox_error = lox_error
 
+        # Intern table for names and string literals, so every occurrence of
+        # the same text in the program shares one str object. Seeded with the
+        # names the interpreter itself looks up.
+        if strings is None:
+            strings = {name: name for name in ("this", "super", "init")}
+        self.strings = strings
+
         self.start = 0
         self.current = 0
         self.line = 1
@@ -21,6 +31,7 @@ class Scanner:
             "for" : TokenType.FOR,
             "fun" : TokenType.FUN,
             "if" : TokenType.IF,
+            "import" : TokenType.IMPORT,
             "nil" : TokenType.NIL,
             "or" : TokenType.OR,
             "print" : TokenType.PRINT,
@@ -49,6 +60,10 @@ class Scanner:
             self.add_token(TokenType.LEFT_BRACE)
         elif c == '}':
             self.add_token(TokenType.RIGHT_BRACE)
+        elif c == '[':
+            self.add_token(TokenType.LEFT_BRACKET)
+        elif c == ']':
+            self.add_token(TokenType.RIGHT_BRACKET)
         elif c == ',':
             self.add_token(TokenType.COMMA)
         elif c == '.':
@@ -71,8 +86,9 @@ class Scanner:
             self.add_token(TokenType.GREATER_EQUAL if self.match('=') else TokenType.GREATER)
         elif c == '/':
             if self.match('/'):
-                while self.peek() != '\n' and not self.is_at_end():
-                    self.advance()
+                # The comment goes until the end of the line.
+                end = self.source.find(self.NEWLINE, self.current)
+                self.current = len(self.source) if end == -1 else end
             else:
                 self.add_token(TokenType.SLASH)
         elif c in [' ', '\r', '\t']:
@@ -87,7 +103,10 @@ class Scanner:
         elif self.is_alpha(c):
             self.identifier()
         else:
-            self.lox_error.error(self.line, f"Unexpected character: '{c}'.")
+            self.unexpected_character(c)
+
+    def unexpected_character(self, c: str) -> None:
+        self.lox_error.error(self.line, f"Unexpected character: '{c}'.")
 
 
     def is_at_end(self) -> bool:
@@ -98,11 +117,18 @@ class Scanner:
         self.current += 1
         return self.source[self.current - 1]
     
-    def add_token(self, token_type, literal=None) -> None:
+    def add_token(self, token_type, literal=None, text=None) -> None:
         # Takes the text of the current lexeme and creates a new token for it. 
-        text = self.source[self.start : self.current]
+        if text is None:
+            text = self.text(self.start, self.current)
         self.tokens.append(Token(token_type, text, literal, self.line))
 
+    def text(self, start: int, end: int) -> str:
+        return self.source[start:end]
+
+    def intern(self, text: str) -> str:
+        return self.strings.setdefault(text, text)
+
     def match(self, expected: str) -> bool:
         # Similair to a conditional advance().
         # We only consume the current character if it's what we are looking for.
@@ -119,20 +145,22 @@ class Scanner:
         return self.source[self.current]
 
     def string(self) -> None:
-        while self.peek() != '"' and not self.is_at_end():
-            if self.peek() == '\n':
-                self.line += 1
-            self.advance()
+        end = self.source.find(self.QUOTE, self.current)
+        if end == -1:
+            end = len(self.source)
+        self.line += self.source[self.current : end].count(self.NEWLINE)
+        self.current = end
 
         # Unterminated string.
         if self.is_at_end():
             self.lox_error.error(self.line, "Unterminated string.")
+            return
 
         # The closing.
         self.advance()
 
         # Trim the surrounding qoutes.
-        value = self.source[self.start + 1 : self.current - 1]
+        value = self.intern(self.text(self.start + 1, self.current - 1))
         self.add_token(TokenType.STRING, value)
 
     def is_digit(self, c: str) -> bool:
@@ -149,7 +177,7 @@ class Scanner:
             while self.is_digit(self.peek()):
                 self.advance()
 
-        self.add_token(TokenType.NUMBER, float(self.source[self.start:self.current]))
+        self.add_token(TokenType.NUMBER, float(self.text(self.start, self.current)))
 
     def peek_next(self) -> str:
         if (self.current + 1) >= len(self.source):
@@ -159,11 +187,11 @@ class Scanner:
     def identifier(self) -> None:
         while self.is_alpha_numeric(self.peek()):
             self.advance()
-        text = self.source[self.start: self.current]
+        text = self.intern(self.text(self.start, self.current))
         token_type = self.keywords.get(text, None)
         if token_type is None:
             token_type = TokenType.IDENTIFIER
-        self.add_token(token_type)
+        self.add_token(token_type, text=text)
 
     def is_alpha(self, c: str) -> bool:
         return (c >= 'a' and c <= 'z') or \
@@ -173,5 +201,46 @@ class Scanner:
     def is_alpha_numeric(self, c: str) -> bool:
         return self.is_alpha(c) or self.is_digit(c)
 
-        
-        
\ No newline at end of file
+
+class ByteScanner(Scanner):
+    # Scans UTF-8 source held as bytes or an mmap without decoding it all
+    # first. Everything outside string literals and comments is ASCII, so
+    # single bytes stand in for characters and only the text of tokens is
+    # decoded.
+    NEWLINE = b'\n'
+    QUOTE = b'"'
+
+    def advance(self) -> str:
+        self.current += 1
+        return chr(self.source[self.current - 1])
+
+    def text(self, start: int, end: int) -> str:
+        return self.source[start:end].decode('utf-8', errors='replace')
+
+    def match(self, expected: str) -> bool:
+        if self.is_at_end():
+            return False
+        if self.source[self.current] != ord(expected):
+            return False
+        self.current += 1
+        return True
+
+    def peek(self) -> str:
+        if self.is_at_end():
+            return '\0'
+        return chr(self.source[self.current])
+
+    def peek_next(self) -> str:
+        if (self.current + 1) >= len(self.source):
+            return '\0'
+        return chr(self.source[self.current + 1])
+
+    def unexpected_character(self, c: str) -> None:
+        # c is the first byte of a character outside ASCII: report the whole
+        # character, the way Scanner sees it
+        if ord(c) >= 0x80:
+            while not self.is_at_end() and 0x80 <= self.source[self.current] < 0xC0 \
+                    and self.current - self.start < 4:
+                self.current += 1
+            c = self.text(self.start, self.current)
+        super().unexpected_character(c)
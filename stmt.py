@@ -22,6 +22,10 @@ class StmtVisitor(ABC):
 	def visit_if_stmt(self, stmt) -> None:
 		raise NotImplementedError
 
+	@abstractmethod
+	def visit_import_stmt(self, stmt) -> None:
+		raise NotImplementedError
+
 	@abstractmethod
 	def visit_print_stmt(self, stmt) -> None:
 		raise NotImplementedError
@@ -49,6 +53,8 @@ class Block(Stmt):
 
 	def __init__(self, statements) -> None:
 		self.statements = statements
+		self.line = None
+		self.layout = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_block_stmt(self)
@@ -60,6 +66,9 @@ class Class(Stmt):
 		self.name = name
 		self.super_class = super_class
 		self.methods = methods
+		self.line = None
+		self.access = None
+		self.layout = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_class_stmt(self)
@@ -69,6 +78,7 @@ class Expression(Stmt):
 
 	def __init__(self, expression) -> None:
 		self.expression = expression
+		self.line = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_expression_stmt(self)
@@ -80,6 +90,9 @@ class Function(Stmt):
 		self.name = name
 		self.params = params
 		self.body = body
+		self.line = None
+		self.access = None
+		self.layout = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_function_stmt(self)
@@ -91,15 +104,29 @@ class If(Stmt):
 		self.condition = condition
 		self.then_branch = then_branch
 		self.else_branch = else_branch
+		self.line = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_if_stmt(self)
 
 
+class Import(Stmt):
+
+	def __init__(self, keyword, path) -> None:
+		self.keyword = keyword
+		self.path = path
+		self.line = None
+		self.module = None
+
+	def accept(self, visitor: StmtVisitor) -> object:
+		return visitor.visit_import_stmt(self)
+
+
 class Print(Stmt):
 
 	def __init__(self, expression) -> None:
 		self.expression = expression
+		self.line = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_print_stmt(self)
@@ -110,6 +137,7 @@ class Return(Stmt):
 	def __init__(self, keyword, value) -> None:
 		self.keyword = keyword
 		self.value = value
+		self.line = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_return_stmt(self)
@@ -117,9 +145,12 @@ class Return(Stmt):
 
 class While(Stmt):
 
-	def __init__(self, condition, body) -> None:
+	def __init__(self, keyword, condition, body) -> None:
+		self.keyword = keyword
 		self.condition = condition
 		self.body = body
+		self.line = None
+		self.counted_loop = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_while_stmt(self)
@@ -130,6 +161,8 @@ class Var(Stmt):
 	def __init__(self, name, initializer) -> None:
 		self.name = name
 		self.initializer = initializer
+		self.line = None
+		self.access = None
 
 	def accept(self, visitor: StmtVisitor) -> object:
 		return visitor.visit_var_stmt(self)
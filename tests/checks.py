@@ -0,0 +1,381 @@
+import asyncio
+import contextlib
+import glob
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+from lox import Lox
+from lox_budget import Budget
+from lox_debugger import Debugger
+from lox_error import LoxError
+from lox_heap_stats import HeapStatsInterpreter
+from interpreter import Interpreter
+from lox_image import load_image, save_image
+from lox_output import BufferedSink, CallbackSink, CaptureSink
+from lox_program import compile
+from lox_type import LoxType
+
+
+# Checks of what a .lox script can't print, such as the annotations the
+# passes leave on the AST. run_tests.py runs every check_ function here
+# along with the scripts; a check fails by raising AssertionError.
+
+
+def check_global_operand_types() -> None:
+    program = compile("var n = 2;\nprint n * 3;\n")
+    assert program.ok, program.diagnostics
+    product = program.statements[1].expression
+    assert product.operand_type is LoxType.NUMBER, f"operand_type is {product.operand_type}"
+
+
+def check_native_results_are_lox_values() -> None:
+    # a host native returning Python ints and functions
+    program = compile("var l = List();\nl.append(\"a\");\nvar n = -u();\nvar e = l[z()];\nvar w = f()(1);\n")
+    assert program.ok, program.diagnostics
+    result = program.run({"u": lambda: 5, "z": lambda: 0, "f": lambda: lambda x: x + 1})
+    assert result.ok, [str(diagnostic) for diagnostic in result.diagnostics]
+    assert result.get("n") == -5.0 and result.get("e") == "a" and result.get("w") == 2.0
+
+
+def check_host_globals_cannot_replace_program_globals() -> None:
+    # n * 2 is proven numeric, a host string in n would reach it unchecked
+    program = compile("print n * 2;\nvar n = 1;\n")
+    assert program.statements[0].expression.operand_type is LoxType.NUMBER
+    try:
+        program.run({"n": "ab"})
+    except ValueError as e:
+        assert "'n'" in str(e), str(e)
+    else:
+        raise AssertionError("a host global replaced a global of the program")
+
+
+def check_image_round_trip() -> None:
+    prelude = compile("""
+class Counter { init() { this.count = 0; } add() { this.count = this.count + 1; return this.count; } }
+var counter = Counter();
+var names = List();
+names.append("a");
+fun make(step) { var total = 0; fun next() { total = total + step; return total; } return next; }
+var twos = make(2);
+""")
+    assert prelude.ok, prelude.diagnostics
+    result = prelude.run()
+    assert result.ok, [str(diagnostic) for diagnostic in result.diagnostics]
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "prelude.img")
+        save_image(path, result.interpreter.lox_globals)
+        image = load_image(path)
+    program = compile("var late = 1;\nprint counter.add() + twos() + late;\nprint names[0];\n", image=image)
+    assert program.ok, program.diagnostics
+    for _ in range(2):
+        # every run starts from its own copy of the saved globals
+        output = CaptureSink()
+        run = program.run(stdout=output, lox_error=LoxError(output, echo=False))
+        assert run.ok, [str(diagnostic) for diagnostic in run.diagnostics]
+        assert output.getvalue() == "4\na\n", repr(output.getvalue())
+
+
+def check_byte_scanner_matches_scanner() -> None:
+    # compile() only scans bytes with ByteScanner for large files, so run
+    # the whole corpus through both scanners
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(__file__), "**", "*.lox"), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as reader:
+            source = reader.read()
+        expected = [str(diagnostic) for diagnostic in compile(source, path=path).diagnostics]
+        actual = [str(diagnostic) for diagnostic in compile(source.encode(), path=path).diagnostics]
+        assert actual == expected, f"{os.path.basename(path)}: {actual} != {expected}"
+
+
+class Stream(io.StringIO):
+    # a stream recording each write, a terminal when tty is true
+    def __init__(self, tty: bool = False) -> None:
+        super().__init__()
+        self.tty = tty
+        self.writes = []
+
+    def write(self, text: str) -> int:
+        self.writes.append(text)
+        return super().write(text)
+
+    def isatty(self) -> bool:
+        return self.tty
+
+
+def check_buffered_sink_threshold() -> None:
+    stream = Stream()
+    sink = BufferedSink(stream, buffer_size=10)
+    sink.write_line("abcd")
+    assert stream.writes == [], stream.writes
+    # five characters with the newline, ten pending now
+    sink.write_line("efgh")
+    sink.write_line("i")
+    assert stream.writes == ["abcd\nefgh\n"], stream.writes
+    sink.flush()
+    sink.flush()
+    assert stream.writes == ["abcd\nefgh\n", "i\n"], stream.writes
+
+
+def check_buffered_sink_line_buffers_a_terminal() -> None:
+    for tty, writes in ((True, ["a\n", "b\n"]), (False, [])):
+        stream = Stream(tty)
+        sink = BufferedSink(stream)
+        sink.write_line("a")
+        sink.write_line("b")
+        assert stream.writes == writes, (tty, stream.writes)
+
+
+def check_output_is_flushed_before_a_runtime_error() -> None:
+    # print output is buffered and errors aren't, in the same stream
+    stream = Stream()
+    result = compile("print 1;\nprint 2 / 0;\n").run(stdout=stream, lox_error=LoxError(stream))
+    assert not result.ok
+    assert stream.getvalue() == "1\nDivision by zero.\n[line: 2]\n", repr(stream.getvalue())
+
+
+def check_callback_sink() -> None:
+    lines = []
+    sink = CallbackSink(lines.append)
+    result = compile("print \"a\";\nprint nil;\nprint x;\n").run(stdout=sink, lox_error=LoxError(sink))
+    assert not result.ok
+    assert lines == ["a", "nil", "Undefined variable 'x'.\n[line: 3]"], lines
+
+
+def check_lox_error_writes_through_a_sink() -> None:
+    output = CaptureSink()
+    program = compile("print 1 +;\nvar 2;\n", LoxError(output))
+    assert not program.ok
+    assert output.lines == [str(diagnostic) for diagnostic in program.diagnostics] and len(output.lines) == 2, \
+        output.lines
+    # echo=False only collects them
+    output = CaptureSink()
+    assert not compile("print 1 +;\n", LoxError(output, echo=False)).ok
+    assert output.lines == [], output.lines
+
+
+DEBUGGED = """var total = 0;
+fun add(n) {
+  var doubled = n * 2;
+  total = total + doubled;
+  return doubled;
+}
+add(1);
+print add(2);
+"""
+
+
+class ScriptedDebugger(Debugger):
+    # Answers every pause with the next action: "step", "next", "finish",
+    # "continue" or a line to break on before continuing.
+    def __init__(self, interpreter: Interpreter, statements: list, actions: list) -> None:
+        super().__init__(interpreter, statements)
+        self.actions = list(actions)
+        self.stops = []
+        self.scopes_seen = []
+
+    def paused(self, stmt: object) -> None:
+        self.stops.append(stmt.line)
+        self.scopes_seen.append(self.scopes())
+        action = self.actions.pop(0) if self.actions else "continue"
+        if isinstance(action, int):
+            self.set_breakpoint(action)
+        elif action != "continue":
+            self.step(action)
+
+
+def debug(actions: list, breakpoints: list = ()) -> ScriptedDebugger:
+    program = compile(DEBUGGED)
+    output = CaptureSink()
+    interpreter, _ = program.start(Interpreter, None, output, LoxError(output), None)
+    debugger = ScriptedDebugger(interpreter, program.statements, actions)
+    for line in breakpoints:
+        debugger.set_breakpoint(line)
+    if actions:
+        debugger.step("step")
+    interpreter.interpret(debugger.statements)
+    assert output.getvalue() == "4\n", repr(output.getvalue())
+    # the debugger patched its own copy of the statements
+    assert not any("accept" in vars(statement) for statement in program.statements)
+    return debugger
+
+
+def check_debugger_breakpoints_and_stepping() -> None:
+    assert debug([], [4]).stops == [4, 4]
+    assert debug(["step"] * 8).stops == [1, 2, 7, 3, 4, 5, 8, 3, 4]
+    # over the call on line 7, then into the one on line 8
+    assert debug(["step", "step", "next", "step"]).stops == [1, 2, 7, 8, 3]
+    # out of the first call, back in the script
+    assert debug(["step", "step", "step", "finish"]).stops == [1, 2, 7, 3, 8]
+    # a breakpoint set while paused
+    assert debug([8]).stops == [1, 8]
+
+
+def check_debugger_scopes() -> None:
+    debugger = debug([], [4])
+    scopes = debugger.scopes_seen[1]
+    assert scopes[0] == ("function add", [("n", 2.0), ("doubled", 4.0)]), scopes[0]
+    title, variables = scopes[-1]
+    assert title == "globals" and ("total", 2.0) in variables, scopes[-1]
+
+
+def check_async_natives() -> None:
+    async def fetch(key):
+        await asyncio.sleep(0)
+        return key + "!"
+
+    program = compile("var got = fetch(\"a\");\nprint got + fetch(\"b\");\n")
+    output = CaptureSink()
+    result = asyncio.run(program.run_async({"fetch": fetch}, stdout=output))
+    assert result.ok, [str(diagnostic) for diagnostic in result.diagnostics]
+    assert output.getvalue() == "a!b!\n", repr(output.getvalue())
+
+
+def check_async_scripts_interleave() -> None:
+    # each script suspends in wait() and the other one runs meanwhile
+    log = []
+
+    async def wait():
+        await asyncio.sleep(0)
+
+    program = compile("log(name + \" 1\");\nwait();\nlog(name + \" 2\");\n")
+
+    async def main():
+        return await asyncio.gather(*[program.run_async({"name": name, "log": log.append, "wait": wait})
+                                      for name in ("a", "b")])
+    results = asyncio.run(main())
+    assert all(result.ok for result in results)
+    assert log == ["a 1", "b 1", "a 2", "b 2"], log
+
+
+def check_async_native_in_sync_run() -> None:
+    async def fetch():
+        return 1
+
+    result = compile("print 1;\nfetch();\n").run({"fetch": fetch}, stdout=CaptureSink())
+    assert [str(diagnostic) for diagnostic in result.diagnostics] == \
+        ["Can't call async native 'fetch' outside async mode.\n[line: 2]"], result.diagnostics
+
+
+def check_heap_stats() -> None:
+    program = compile("""var a = "x" + "y";
+var b = upper(a);
+var c = toString(12);
+var n = len(a);
+fun f(s) { return lower(s) + "!"; }
+var d = f(b);
+f(a);
+""")
+    result = program.run(stdout=CaptureSink(), interpreter_class=HeapStatsInterpreter)
+    assert result.ok, [str(diagnostic) for diagnostic in result.diagnostics]
+    heap_stats = result.interpreter.heap_stats
+    assert heap_stats.total == {"environments": 2, "functions": 1, "bound methods": 0, "instances": 0,
+                                "strings": 7}, heap_stats.total
+    # a to d, the rest are garbage once f returns
+    assert heap_stats.live == {"environments": 0, "functions": 1, "bound methods": 0, "instances": 0,
+                               "strings": 4}, heap_stats.live
+    assert heap_stats.sites == {("strings", 1): 1, ("strings", 2): 1, ("strings", 3): 1, ("strings", 5): 4,
+                                ("functions", 5): 1, ("environments", 6): 1, ("environments", 7): 1}, \
+        heap_stats.sites
+
+
+def run_script(source: str, lox: Lox) -> tuple:
+    # exit status and output of source run from a file by the CLI's Lox
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "script.lox")
+        with open(path, 'w') as writer:
+            writer.write(source)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            status = lox.run_file(path)
+    return status, output.getvalue()
+
+
+def check_budget_limits() -> None:
+    cases = [
+        ("while (true) {}", Budget(max_steps=100), "Step limit of 100 exceeded."),
+        ("fun f(n) { return f(n + 1); }\nf(0);", Budget(max_depth=20), "Call depth limit of 20 exceeded."),
+        ("while (true) {}", Budget(max_seconds=0.05), "Time limit of 0.05 seconds exceeded."),
+        ("class A {}\nwhile (true) A();", Budget(max_instances=10), "Instance limit of 10 exceeded."),
+    ]
+    for source, budget, message in cases:
+        status, output = run_script(source, Lox(budget=budget))
+        assert status == 70 and output.startswith(message + "\n"), (status, output)
+
+
+def check_deep_recursion_is_a_runtime_error() -> None:
+    source = "fun f(n) { return f(n + 1); }\nf(0);"
+    for budget in (None, Budget(max_steps=10 ** 6)):
+        status, output = run_script(source, Lox(budget=budget))
+        assert status == 70 and output.startswith("Stack overflow.\n"), (status, output)
+    try:
+        Budget(max_depth=Budget.reachable_depth() + 1)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("a call depth limit Python can't reach was accepted")
+
+
+def check_deep_nesting_is_a_compile_error() -> None:
+    for source in ("print " + "(" * 3000 + "1" + ")" * 3000 + ";", "{" * 2000 + "}" * 2000):
+        assert [str(diagnostic) for diagnostic in compile(source).diagnostics] == \
+            ["[line 1 Error]: Source nested too deeply."]
+
+
+LOX = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "lox.py")
+
+
+def run_batch(directory: str, scripts: dict, arguments: list) -> subprocess.CompletedProcess:
+    # writes scripts, paths relative to directory, and runs the CLI there
+    for path, source in scripts.items():
+        path = os.path.join(directory, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as writer:
+            writer.write(source)
+    return subprocess.run([sys.executable, LOX, *arguments], cwd=directory, capture_output=True, text=True)
+
+
+def check_batch_order_and_status() -> None:
+    # the slow script comes first and finishes last
+    scripts = {
+        "a.lox": "var i = 0;\nwhile (i < 100000) i = i + 1;\nprint \"a\";\n",
+        "b.lox": "print \"b\";\nprint 1 / 0;\n",
+        "c.lox": "print \"c\";\nprint;\n",
+        "d.lox": "print \"d\";\n",
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        result = run_batch(directory, scripts, ["--jobs", "4", "a.lox", "b.lox", "c.lox", "d.lox"])
+    assert result.stdout == ("==> a.lox <==\na\n"
+                             "==> b.lox <==\nb\nDivision by zero.\n[line: 2]\n[exit 70]\n"
+                             "==> c.lox <==\n[line 2 Error] at ';': Expect expression.\n[exit 65]\n"
+                             "==> d.lox <==\nd\n"), result.stdout
+    # the highest of the scripts' statuses
+    assert result.returncode == 70, (result.returncode, result.stderr)
+
+
+def check_batch_globs_and_manifest() -> None:
+    scripts = {
+        "scripts/b.lox": "print \"b\";\n",
+        "scripts/a.lox": "print \"a\";\n",
+        "scripts/notes.txt": "",
+        "suite/manifest": "# relative to the manifest\n../scripts/a.lox\n\nnested/c.lox\n",
+        "suite/nested/c.lox": "print \"c\";\n",
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        result = run_batch(directory, scripts, ["scripts/*.lox", "--manifest", "suite/manifest"])
+    assert result.returncode == 0, result.stderr
+    headers = [line for line in result.stdout.splitlines() if line.startswith("==>")]
+    assert headers == ["==> scripts/a.lox <==", "==> scripts/b.lox <==",
+                       "==> suite/../scripts/a.lox <==", "==> suite/nested/c.lox <=="], headers
+
+
+def check_batch_rejects_single_script_options() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for option in (["--save-image", "out.img"], ["--debug"]):
+            result = run_batch(directory, {"a.lox": "", "b.lox": ""}, [*option, "a.lox", "b.lox"])
+            assert result.returncode == 2 and "need a single script" in result.stderr, result.stderr
+            assert not os.path.exists(os.path.join(directory, "out.img"))
+
+
+CHECKS = [value for name, value in sorted(globals().items()) if name.startswith("check_")]
@@ -2,39 +2,52 @@ from pydoc import classname
 import sys
 
 
+# Fields after "|" are annotations: not constructor arguments, they start
+# out None and are filled in by the parser (line), the Resolver and the
+# passes after it.
 expr = [
     "Literal  : value",
-    "Variable : name",
+    "Variable : name | access, global_slot",
     "Logical  : left, operator, right",
     "Set      : object, name, value",
-    "Super    : keyword, method",
-    "This     : keyword",
+    "Super    : keyword, method | access, global_slot, this",
+    "This     : keyword | access, global_slot",
     "Unary    : operator, right",
-    "Binary   : left, operator, right",
+    "Binary   : left, operator, right | operand_type",
     "Call     : callee, paren, arguments",
     "Get      : object, name",
+    "Index    : object, bracket, index",
+    "IndexSet : object, bracket, index, value",
     "Grouping : expression",
-    "Assign   : name, value",
+    "Assign   : name, value | access, global_slot",
 ]
+# Statements have the line they start on, except for the ones the parser
+# makes up itself, such as those of a desugared 'for'.
 statements = [
-    "Block      : statements",
-    "Class      : name, super_class, methods",
-    "Expression : expression",
-    "Function   : name, params, body",
-    "If         : condition, then_branch, else_branch",
-    "Print      : expression",
-    "Return     : keyword, value",
-    "While      : condition, body",
-    "Var        : name, initializer",
+    "Block      : statements | line, layout",
+    "Class      : name, super_class, methods | line, access, layout",
+    "Expression : expression | line",
+    "Function   : name, params, body | line, access, layout",
+    "If         : condition, then_branch, else_branch | line",
+    "Import     : keyword, path | line, module",
+    "Print      : expression | line",
+    "Return     : keyword, value | line",
+    "While      : keyword, condition, body | line, counted_loop",
+    "Var        : name, initializer | line, access",
 ]
 
 def define_type(file, base_name, class_name, fields):
+    fields, _, annotations = fields.partition("|")
+    fields = fields.strip()
     file.write(f"class {class_name}({base_name}):\n\n")
     file.write(f"\tdef __init__(self, {fields}) -> None:\n")
     fields = fields.split(", ")
     for field in fields:
         name = field.split(" ")[0]
         file.write(f"\t\tself.{name} = {name}\n")
+    if annotations:
+        for name in annotations.strip().split(", "):
+            file.write(f"\t\tself.{name} = None\n")
     file.write(f"\n\tdef accept(self, visitor: {base_name}Visitor) -> object:\n")
     file.write(f"\t\treturn visitor.visit_{class_name.lower()}_{base_name.lower()}(self)\n\n")
 
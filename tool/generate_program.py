@@ -0,0 +1,218 @@
+import argparse
+import random
+import sys
+
+
+# Generates valid Lox programs of a given shape and size, for stress tests
+# and tool/scaling_benchmark.py.
+#   python tool/generate_program.py SHAPE SIZE [--seed N]
+
+
+class ProgramGenerator:
+    # Random statements and expressions that follow the grammar and the
+    # resolver's rules. Every variable holds a number, loops run a bounded
+    # number of times and calls match their function's arity, so generated
+    # programs also run without runtime errors. Function bodies make no
+    # calls, which keeps the running time linear in the size.
+
+    def __init__(self, seed: int = 1, max_depth: int = 3, expression_depth: int = 3) -> None:
+        self.random = random.Random(seed)
+        # nesting of blocks and function bodies inside a random statement
+        self.max_depth = max_depth
+        self.expression_depth = expression_depth
+        # names in scope, innermost scope last
+        self.scopes = [[]]
+        # arity of every function, by name
+        self.arity = {}
+        # loop counters, which are never assigned to
+        self.counters = set()
+        self.in_function = False
+        self.count = 0
+
+    def fresh(self, prefix: str) -> str:
+        self.count += 1
+        return f"{prefix}{self.count}"
+
+    def variables(self) -> list[str]:
+        return [name for scope in self.scopes for name in scope if name not in self.arity]
+
+    def functions(self) -> list[str]:
+        return [name for scope in self.scopes for name in scope if name in self.arity]
+
+    def expression(self, depth: int = None) -> str:
+        if depth is None:
+            depth = self.expression_depth
+        variables = self.variables()
+        if depth == 0 or self.random.random() < 0.2:
+            if variables and self.random.random() < 0.6:
+                return self.random.choice(variables)
+            return str(self.random.randrange(100))
+        shape = self.random.randrange(5)
+        if shape == 0:
+            return "-" + self.expression(depth - 1)
+        if shape == 1:
+            return "(" + self.expression(depth - 1) + ")"
+        functions = [] if self.in_function else self.functions()
+        if shape == 2 and functions:
+            name = self.random.choice(functions)
+            return name + "(" + ", ".join(self.expression(depth - 1) for _ in range(self.arity[name])) + ")"
+        operator = self.random.choice(["+", "-", "*"])
+        return self.expression(depth - 1) + " " + operator + " " + self.expression(depth - 1)
+
+    def condition(self) -> str:
+        operator = self.random.choice(["<", "<=", ">", ">=", "==", "!="])
+        return self.expression(1) + " " + operator + " " + self.expression(1)
+
+    def block(self, depth: int, statements: int) -> str:
+        self.scopes.append([])
+        body = [self.statement(depth) for _ in range(statements)]
+        self.scopes.pop()
+        return "{\n" + "\n".join(body) + "\n}"
+
+    def statement(self, depth: int = 0) -> str:
+        variables = self.variables()
+        nested = depth < self.max_depth
+        shape = self.random.randrange(7 if nested else 3)
+        if shape == 0 or not variables:
+            name = self.fresh("v")
+            line = f"var {name} = {self.expression()};"
+            self.scopes[-1].append(name)
+            return line
+        if shape == 1:
+            targets = [name for name in variables if name not in self.counters]
+            if targets:
+                return f"{self.random.choice(targets)} = {self.expression()};"
+        if shape == 2:
+            return f"print {self.expression()};"
+        if shape == 3:
+            text = f"if ({self.condition()}) {self.block(depth + 1, 2)}"
+            if self.random.random() < 0.5:
+                text += f" else {self.block(depth + 1, 2)}"
+            return text
+        if shape == 4:
+            counter = self.fresh("i")
+            self.counters.add(counter)
+            self.scopes.append([counter])
+            text = f"for (var {counter} = 0; {counter} < {self.random.randrange(1, 4)}; " \
+                   f"{counter} = {counter} + 1) {self.block(depth + 1, 2)}"
+            self.scopes.pop()
+            return text
+        if shape == 5:
+            return self.block(depth + 1, 3)
+        if shape == 6:
+            return self.function(depth)
+        return f"print {self.expression()};"
+
+    def function(self, depth: int) -> str:
+        name = self.fresh("f")
+        params = [self.fresh("p") for _ in range(self.random.randrange(3))]
+        in_function = self.in_function
+        self.in_function = True
+        self.scopes.append(list(params))
+        body = self.block(depth + 1, 2)
+        result = self.expression()
+        self.scopes.pop()
+        self.in_function = in_function
+        self.arity[name] = len(params)
+        self.scopes[-1].append(name)
+        return f"fun {name}({', '.join(params)}) {body[:-1]}return {result};\n}}"
+
+    def program(self, statements: int) -> str:
+        return "\n".join(self.statement() for _ in range(statements)) + "\n"
+
+
+# The shapes below each grow one dimension of a program with size.
+
+def statements(size: int, seed: int = 1) -> str:
+    # a long file of random top-level statements
+    return ProgramGenerator(seed).program(size)
+
+
+def nesting(size: int, seed: int = 1) -> str:
+    # blocks nested size deep, the innermost one reading variables declared
+    # at up to 16 levels spread from the outermost one in
+    lines = []
+    for level in range(size):
+        lines.append("{ var d" + str(level) + " = " + str(level) + ";")
+    lines.append("print " + " + ".join(f"d{level}" for level in range(0, size, max(1, size // 16))) + ";")
+    lines.append("}" * size)
+    return "\n".join(lines) + "\n"
+
+
+def expression(size: int, seed: int = 1) -> str:
+    # one expression with size levels of parentheses
+    rng = random.Random(seed)
+    text = "1"
+    for _ in range(size):
+        text = str(rng.randrange(10)) + " + (" + text + ")"
+    return "print " + text + ";\n"
+
+
+def wide_class(size: int, seed: int = 1) -> str:
+    # a class with size methods, all of them called
+    lines = ["class Wide {"]
+    for index in range(size):
+        lines.append(f"  m{index}(x) {{ return x + {index}; }}")
+    lines.append("}")
+    lines.append("var wide = Wide();")
+    lines.append("var total = 0;")
+    for index in range(size):
+        lines.append(f"total = wide.m{index}(total);")
+    lines.append("print total;")
+    return "\n".join(lines) + "\n"
+
+
+def inheritance(size: int, seed: int = 1) -> str:
+    # a chain of size subclasses, each method calling the one it overrides
+    lines = ["class C0 { depth() { return 0; } }"]
+    for index in range(1, size):
+        lines.append(f"class C{index} < C{index - 1} {{ depth() {{ return super.depth() + 1; }} }}")
+    lines.append(f"print C{size - 1}().depth();")
+    return "\n".join(lines) + "\n"
+
+
+def closures(size: int, seed: int = 1) -> str:
+    # functions nested size deep, the innermost capturing a parameter of the
+    # outermost through every level in between
+    lines = []
+    for level in range(size):
+        lines.append(f"fun f{level}(a{level}) {{")
+    lines.append(f"return a0 + a{size - 1};")
+    for level in range(size - 1, 0, -1):
+        lines.append("}")
+        lines.append(f"return f{level}(a{level - 1} + 1);")
+    lines.append("}")
+    lines.append("print f0(1);")
+    return "\n".join(lines) + "\n"
+
+
+def string(size: int, seed: int = 1) -> str:
+    # one string literal of size characters
+    rng = random.Random(seed)
+    text = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz ") for _ in range(size))
+    return f"var s = \"{text}\";\nprint s + s == s + s;\n"
+
+
+SHAPES = {
+    "statements": statements,
+    "nesting": nesting,
+    "expression": expression,
+    "wide_class": wide_class,
+    "inheritance": inheritance,
+    "closures": closures,
+    "string": string,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="generate_program")
+    parser.add_argument("shape", choices=sorted(SHAPES))
+    parser.add_argument("size", type=int)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    sys.stdout.write(SHAPES[args.shape](args.size, args.seed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+import glob
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lox_error import LoxError
+from lox_token import Token
+from lox_parser import LoxParser
+from pratt_parser import PrattParser
+from scanner import Scanner
+
+
+# Checks that PrattParser builds the same ASTs and reports the same errors
+# as LoxParser, then compares their speed in tokens/s.
+#   python tool/parse_benchmark.py [script.lox ...]
+
+
+def same_tree(a: object, b: object) -> bool:
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, Token):
+        return (a.token_type, a.lexeme, a.literal, a.line) == (b.token_type, b.lexeme, b.literal, b.line)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(same_tree(x, y) for x, y in zip(a, b))
+    if hasattr(a, "__dict__"):
+        return a.__dict__.keys() == b.__dict__.keys() \
+            and all(same_tree(a.__dict__[key], b.__dict__[key]) for key in a.__dict__)
+    return a == b
+
+
+def parse(parser_class: type, tokens: list) -> tuple:
+    lox_error = LoxError(echo=False)
+    statements = parser_class(tokens, lox_error).parse()
+    return statements, [str(diagnostic) for diagnostic in lox_error.diagnostics]
+
+
+def expression(depth: int) -> str:
+    if depth == 0:
+        return random.choice(["x", "1", "2.5", "\"s\"", "true", "nil", "this", "a.b", "f()"])
+    shape = random.randrange(6)
+    if shape == 0:
+        return random.choice(["-", "!"]) + expression(depth - 1)
+    if shape == 1:
+        return "(" + expression(depth - 1) + ")"
+    if shape == 2:
+        return "g(" + expression(depth - 1) + ", " + expression(depth - 1) + ")"
+    operator = random.choice(["+", "-", "*", "/", "<", "<=", ">", ">=", "==", "!=", "and", "or"])
+    return expression(depth - 1) + " " + operator + " " + expression(depth - 1)
+
+
+def generated_source(statements: int) -> str:
+    random.seed(1)
+    lines = []
+    for _ in range(statements):
+        lines.append("x = " + expression(4) + ";")
+        lines.append("print " + expression(3) + ";")
+    return "\n".join(lines)
+
+
+def tokens_per_second(parser_class: type, tokens: list) -> float:
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        parser_class(tokens, LoxError(echo=False)).parse()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(tokens) / best
+
+
+def main() -> int:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = sys.argv[1:] or sorted(glob.glob(os.path.join(root, "tests", "*.lox")))
+    sources = [(path, open(path, 'r').read()) for path in paths]
+    sources.append(("<generated>", generated_source(2000)))
+
+    different = 0
+    for name, source in sources:
+        tokens = Scanner(source, LoxError(echo=False)).scan_tokens()
+        expected, expected_errors = parse(LoxParser, tokens)
+        actual, actual_errors = parse(PrattParser, tokens)
+        if not same_tree(expected, actual) or expected_errors != actual_errors:
+            print(f"DIFFERENT {name}")
+            different += 1
+
+    tokens = Scanner(sources[-1][1], LoxError(echo=False)).scan_tokens()
+    for parser_class in (LoxParser, PrattParser):
+        print(f"{parser_class.__name__:<12} {tokens_per_second(parser_class, tokens):>12,.0f} tokens/s")
+    print(f"{len(sources) - different} of {len(sources)} sources parse the same")
+    return 1 if different else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
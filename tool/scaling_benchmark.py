@@ -0,0 +1,202 @@
+import argparse
+import gc
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lox_error import LoxError
+from lox_output import CaptureSink
+from lox_parser import LoxParser
+from pratt_parser import PrattParser
+from scanner import Scanner
+from resolver import Resolver
+from loop_analyzer import LoopAnalyzer
+from type_inferrer import TypeInferrer
+from interpreter import Interpreter
+from generate_program import SHAPES
+
+
+# Times every phase on generated programs of growing size and reports how
+# each phase grows, to catch superlinear behavior and recursion limits
+# before real inputs run into them.
+#   python tool/scaling_benchmark.py [--shapes a,b] [--sizes 100,200,...] [--csv FILE]
+# Exits with 1 when some phase grew superlinearly or failed.
+
+PHASES = ("scan", "parse", "resolve", "run")
+
+# A phase that grows faster than bytes**SUPERLINEAR between the two largest
+# sizes is reported, unless it takes less than MIN_SECONDS, which is too
+# little to time reliably. Linear phases measure up to about 1.3 because of
+# the garbage collector, quadratic ones close to 2.
+SUPERLINEAR = 1.5
+MIN_SECONDS = 0.005
+
+DEFAULT_SIZES = {
+    "statements": (250, 500, 1000, 2000, 4000),
+    "nesting": (50, 100, 200, 400, 800),
+    "expression": (25, 50, 100, 200, 400),
+    "wide_class": (250, 500, 1000, 2000, 4000),
+    "inheritance": (25, 50, 100, 200, 400),
+    "closures": (25, 50, 100, 200, 400),
+    "string": (100000, 200000, 400000, 800000, 1600000),
+}
+
+
+class Measurement:
+    def __init__(self, shape: str, size: int, length: int) -> None:
+        self.shape = shape
+        self.size = size
+        self.length = length
+        # phase -> seconds and peak bytes allocated while it ran
+        self.seconds = {}
+        self.peak = {}
+        # the phase that failed and why
+        self.failure = None
+
+
+def run_phases(source: str, parser_class: type, measurement: Measurement, trace: bool) -> None:
+    lox_error = LoxError(echo=False)
+    interpreter = Interpreter(lox_error, CaptureSink())
+    state = {}
+
+    def scan():
+        state["tokens"] = Scanner(source, lox_error).scan_tokens()
+
+    def parse():
+        state["statements"] = parser_class(state["tokens"], lox_error).parse()
+
+    def resolve():
+        Resolver(interpreter, lox_error).resolve_block(state["statements"])
+        LoopAnalyzer(interpreter).analyze(state["statements"])
+        TypeInferrer(interpreter).infer(state["statements"])
+
+    def run():
+        interpreter.interpret(state["statements"])
+
+    for phase, step in zip(PHASES, (scan, parse, resolve, run)):
+        # start every phase without garbage from the ones before
+        gc.collect()
+        if trace:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            step()
+        except RecursionError:
+            measurement.failure = (phase, "recursion limit")
+            return
+        if trace:
+            measurement.peak[phase] = tracemalloc.get_traced_memory()[1] - start_memory
+        else:
+            elapsed = time.perf_counter() - start
+            measurement.seconds[phase] = min(elapsed, measurement.seconds.get(phase, elapsed))
+        if lox_error.diagnostics:
+            measurement.failure = (phase, str(lox_error.diagnostics[0]).replace("\n", " "))
+            return
+
+
+def measure(shape: str, size: int, parser_class: type, repeat: int) -> Measurement:
+    # Times are the best of repeat runs without tracemalloc, which slows
+    # allocation down, and memory is measured in one more run with it.
+    source = SHAPES[shape](size)
+    measurement = Measurement(shape, size, len(source))
+    for _ in range(repeat):
+        run_phases(source, parser_class, measurement, False)
+        if measurement.failure is not None:
+            return measurement
+    if measurement.failure is None:
+        tracemalloc.start()
+        try:
+            run_phases(source, parser_class, measurement, True)
+        finally:
+            tracemalloc.stop()
+    return measurement
+
+
+def growth(smaller: Measurement, larger: Measurement, phase: str) -> float:
+    # exponent k of time ~ bytes**k between two sizes, bytes being closer
+    # to the input's real size than the shape's size parameter
+    before, after = smaller.seconds.get(phase), larger.seconds.get(phase)
+    if not before or not after or after < MIN_SECONDS:
+        return None
+    return math.log(after / before) / math.log(larger.length / smaller.length)
+
+
+def report(shape: str, measurements: list) -> list[str]:
+    lines = [f"{shape}",
+             f"  {'size':>8} {'bytes':>10}" + "".join(f" {phase + ' ms':>10}" for phase in PHASES)
+             + "".join(f" {phase + ' KiB':>11}" for phase in PHASES)]
+    for measurement in measurements:
+        line = f"  {measurement.size:>8} {measurement.length:>10}"
+        line += "".join(f" {measurement.seconds[phase] * 1000:>10.2f}" if phase in measurement.seconds
+                        else f" {'-':>10}" for phase in PHASES)
+        line += "".join(f" {measurement.peak[phase] / 1024:>11.1f}" if phase in measurement.peak
+                        else f" {'-':>11}" for phase in PHASES)
+        lines.append(line)
+        if measurement.failure is not None:
+            phase, reason = measurement.failure
+            lines.append(f"  {measurement.size:>8} failed in {phase}: {reason}")
+
+    complete = [measurement for measurement in measurements if measurement.failure is None]
+    if len(complete) >= 2:
+        exponents = []
+        for phase in PHASES:
+            exponent = growth(complete[-2], complete[-1], phase)
+            if exponent is None:
+                continue
+            flag = "  SUPERLINEAR" if exponent > SUPERLINEAR else ""
+            exponents.append(f"{phase} {exponent:.2f}{flag}")
+        lines.append("  growth: " + (", ".join(exponents) or "too fast to tell"))
+    return lines
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="scaling_benchmark")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="comma separated shapes to measure")
+    parser.add_argument("--sizes", help="comma separated sizes, instead of the defaults of each shape")
+    parser.add_argument("--parser", choices=("pratt", "lox"), default="pratt")
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the best time of")
+    parser.add_argument("--csv", help="also write every measurement to this file, for plotting")
+    args = parser.parse_args()
+
+    parser_class = PrattParser if args.parser == "pratt" else LoxParser
+    rows = []
+    flagged = 0
+    for shape in args.shapes.split(","):
+        sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else DEFAULT_SIZES[shape]
+        measurements = []
+        for size in sizes:
+            measurement = measure(shape, size, parser_class, args.repeat)
+            measurements.append(measurement)
+            if measurement.failure is not None:
+                break
+        lines = report(shape, measurements)
+        flagged += sum(line.count("SUPERLINEAR") for line in lines) \
+            + sum(measurement.failure is not None for measurement in measurements)
+        print("\n".join(lines))
+        rows.extend(measurements)
+
+    if args.csv:
+        with open(args.csv, 'w') as writer:
+            writer.write("shape,size,bytes," + ",".join(f"{phase}_ms,{phase}_kib" for phase in PHASES)
+                         + ",failure\n")
+            for measurement in rows:
+                cells = [measurement.shape, str(measurement.size), str(measurement.length)]
+                for phase in PHASES:
+                    seconds = measurement.seconds.get(phase)
+                    peak = measurement.peak.get(phase)
+                    cells.append("" if seconds is None else f"{seconds * 1000:.3f}")
+                    cells.append("" if peak is None else f"{peak / 1024:.1f}")
+                failure = measurement.failure
+                cells.append("" if failure is None else f"{failure[0]}: {failure[1]}".replace(",", ";"))
+                writer.write(",".join(cells) + "\n")
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+from environment import GlobalEnvironment
+from interpreter import Interpreter
+from lox_type import LoxType
+from lox_token import Token, TokenType
+from expr import ExprVisitor, Literal, Grouping, Expr, Unary, \
+                 Binary, Variable, Assign, Logical, Call, Get, Set, \
+                 This, Super, Index, IndexSet
+from stmt import StmtVisitor, Stmt, Expression, Print, Var, Block, \
+                 If, While, Function, Return, Class, Import
+
+
+class TypeInferrer(ExprVisitor, StmtVisitor):
+    # Flow-insensitive type inference over the resolved program. A variable's
+    # type is the join of every value ever stored in it, so the walk repeats
+    # until no variable changes. Binary operations whose operands are then
+    # proven numbers (or strings for '+') are handed to the interpreter, which
+    # skips the runtime operand checks for them.
+    NUMBER_OPERATORS = (TokenType.MINUS, TokenType.PLUS, TokenType.SLASH, TokenType.STAR,
+                        TokenType.GREATER, TokenType.GREATER_EQUAL,
+                        TokenType.LESS, TokenType.LESS_EQUAL)
+    COMPARISONS = (TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS,
+                   TokenType.LESS_EQUAL, TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL)
+
+    def __init__(self, interpreter: Interpreter) -> None:
+        self.interpreter = interpreter
+        # declaration (a Var, Function or Class stmt, a parameter Token, or
+        # a global name) -> joined type of the values stored in it
+        self.types = {}
+        self.scopes = []
+        self.top_level = set()
+        self.changed = False
+        self.proven = {}
+        self.operations = 0
+
+    def infer(self, statements: list[Stmt]) -> None:
+        # Natives and the globals of an image already hold values, which the
+        # program may redefine. The Resolver gave every other global a slot
+        # too, but those start out undefined and only get what it stores.
+        lox_globals = self.interpreter.lox_globals
+        for name, slot in lox_globals.slots.items():
+            if lox_globals.values[slot] is not GlobalEnvironment.UNDEFINED:
+                self.types[name] = LoxType.UNKNOWN
+        for statement in statements:
+            if isinstance(statement, (Var, Function, Class)):
+                self.top_level.add(statement.name.lexeme)
+
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            self.proven = {}
+            self.operations = 0
+            self.walk_block(statements)
+
+        for expr, operand_type in self.proven.items():
+            self.interpreter.resolve_type(expr, operand_type)
+
+    def report(self) -> str:
+        return f"Proven operand types for {len(self.proven)} of {self.operations} operations."
+
+    def walk_block(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self.walk(statement)
+
+    def walk(self, node: object) -> object:
+        if node is None:
+            return LoxType.NIL
+        return node.accept(self)
+
+    def declare(self, name: Token, key: object, value_type: LoxType) -> None:
+        if self.scopes:
+            self.scopes[-1][name.lexeme] = key
+        else:
+            key = name.lexeme
+        self.store(key, value_type)
+
+    def store(self, key: object, value_type: LoxType) -> None:
+        old = self.types.get(key, None)
+        new = LoxType.join(old, value_type)
+        if new is not old:
+            self.types[key] = new
+            self.changed = True
+
+    def lookup(self, name: Token) -> object:
+        for scope in reversed(self.scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+        return name.lexeme
+
+    def walk_function(self, fun: Function) -> None:
+        self.scopes.append({})
+        for param in fun.params:
+            self.declare(param, param, LoxType.UNKNOWN)
+        self.walk_block(fun.body)
+        self.scopes.pop()
+
+    def visit_block_stmt(self, stmt: Block) -> None:
+        self.scopes.append({})
+        self.walk_block(stmt.statements)
+        self.scopes.pop()
+
+    def visit_class_stmt(self, stmt: Class) -> None:
+        self.declare(stmt.name, stmt, LoxType.UNKNOWN)
+        self.walk(stmt.super_class)
+        for method in stmt.methods:
+            self.walk_function(method)
+
+    def visit_expression_stmt(self, stmt: Expression) -> None:
+        self.walk(stmt.expression)
+
+    def visit_function_stmt(self, stmt: Function) -> None:
+        self.declare(stmt.name, stmt, LoxType.UNKNOWN)
+        self.walk_function(stmt)
+
+    def visit_if_stmt(self, stmt: If) -> None:
+        self.walk(stmt.condition)
+        self.walk(stmt.then_branch)
+        if stmt.else_branch is not None:
+            self.walk(stmt.else_branch)
+
+    def visit_import_stmt(self, stmt: Import) -> None:
+        # nothing is known about the values a module exports
+        if stmt.module is not None:
+            for name in stmt.module.exports:
+                self.store(name, LoxType.UNKNOWN)
+
+    def visit_print_stmt(self, stmt: Print) -> None:
+        self.walk(stmt.expression)
+
+    def visit_return_stmt(self, stmt: Return) -> None:
+        if stmt.value is not None:
+            self.walk(stmt.value)
+
+    def visit_var_stmt(self, stmt: Var) -> None:
+        value_type = self.walk(stmt.initializer)
+        self.declare(stmt.name, stmt, value_type)
+
+    def visit_while_stmt(self, stmt: While) -> None:
+        self.walk(stmt.condition)
+        self.walk(stmt.body)
+
+    def visit_assign_expr(self, expr: Assign) -> LoxType:
+        value_type = self.walk(expr.value)
+        self.store(self.lookup(expr.name), value_type)
+        return value_type
+
+    def visit_binary_expr(self, expr: Binary) -> LoxType:
+        left = self.walk(expr.left)
+        right = self.walk(expr.right)
+        operator_type = expr.operator.token_type
+        if operator_type in TypeInferrer.NUMBER_OPERATORS:
+            self.operations += 1
+            if left is LoxType.NUMBER and right is LoxType.NUMBER:
+                self.proven[expr] = LoxType.NUMBER
+            elif operator_type == TokenType.PLUS and left is LoxType.STRING and right is LoxType.STRING:
+                self.proven[expr] = LoxType.STRING
+
+        if operator_type in TypeInferrer.COMPARISONS:
+            return LoxType.BOOL
+        if operator_type != TokenType.PLUS:
+            # '-', '*' and '/' either fail or produce a number
+            return LoxType.NUMBER
+        if left is LoxType.NUMBER and right is LoxType.NUMBER:
+            return LoxType.NUMBER
+        if left is LoxType.STRING or right is LoxType.STRING:
+            return LoxType.STRING
+        if left is None or right is None:
+            return None
+        return LoxType.UNKNOWN
+
+    def visit_call_expr(self, expr: Call) -> LoxType:
+        self.walk(expr.callee)
+        for argument in expr.arguments:
+            self.walk(argument)
+        return LoxType.UNKNOWN
+
+    def visit_get_expr(self, expr: Get) -> LoxType:
+        self.walk(expr.object)
+        return LoxType.UNKNOWN
+
+    def visit_index_expr(self, expr: Index) -> LoxType:
+        self.walk(expr.object)
+        self.walk(expr.index)
+        return LoxType.UNKNOWN
+
+    def visit_indexset_expr(self, expr: IndexSet) -> LoxType:
+        self.walk(expr.object)
+        self.walk(expr.index)
+        return self.walk(expr.value)
+
+    def visit_grouping_expr(self, expr: Grouping) -> LoxType:
+        return self.walk(expr.expression)
+
+    def visit_literal_expr(self, expr: Literal) -> LoxType:
+        return LoxType.of(expr.value)
+
+    def visit_logical_expr(self, expr: Logical) -> LoxType:
+        return LoxType.join(self.walk(expr.left), self.walk(expr.right))
+
+    def visit_set_expr(self, expr: Set) -> LoxType:
+        self.walk(expr.object)
+        return self.walk(expr.value)
+
+    def visit_super_expr(self, expr: Super) -> LoxType:
+        return LoxType.UNKNOWN
+
+    def visit_this_expr(self, expr: This) -> LoxType:
+        return LoxType.INSTANCE
+
+    def visit_unary_expr(self, expr: Unary) -> LoxType:
+        right = self.walk(expr.right)
+        if expr.operator.token_type == TokenType.BANG:
+            return LoxType.BOOL
+        return LoxType.NUMBER
+
+    def visit_variable_expr(self, expr: Variable) -> LoxType:
+        key = self.lookup(expr.name)
+        if isinstance(key, str) and key not in self.top_level:
+            # natives, and globals the program never defines
+            return LoxType.UNKNOWN
+        return self.types.get(key, None)